@@ -1,66 +0,0 @@
-from http.server import BaseHTTPRequestHandler
-import json
-import os
-import redis
-import requests
-from utils.cors import cors_headers
-
-# שינוי: Redis URL
-redis_url = os.environ.get("shopipetbot_REDIS_URL")
-r = redis.from_url(redis_url, ssl_cert_reqs=None)
-
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self.send_response(200)
-        for k, v in cors_headers().items():
-            self.send_header(k, v)
-        self.end_headers()
-
-    def do_POST(self):
-        length = int(self.headers.get('content-length'))
-        body = json.loads(self.rfile.read(length))
-        
-        phone = body.get("phone")
-        user_code = body.get("code")
-
-        stored_code = r.get(f"otp:{phone}")
-        
-        if not stored_code or stored_code.decode('utf-8') != user_code:
-            self.send_response(401)
-            for k, v in cors_headers().items():
-                self.send_header(k, v)
-            self.end_headers()
-            self.wfile.write(json.dumps({"success": False, "message": "Code Invalid"}).encode('utf-8'))
-            return
-
-        r.delete(f"otp:{phone}")
-
-        # שינוי: משתני WooCommerce הקיימים אצלך
-        wc_url = os.environ.get("WOO_BASE_URL")
-        auth = (os.environ.get("WOO_CONSUMER_KEY"), os.environ.get("WOO_CONSUMER_SECRET"))
-        
-        try:
-            res = requests.get(f"{wc_url}/wp-json/wc/v3/orders", auth=auth, params={"search": phone}, timeout=10)
-            orders = res.json()
-            
-            formatted_orders = []
-            if orders:
-                for order in orders[:3]:
-                    formatted_orders.append({
-                        "id": order['id'],
-                        "status": order['status'],
-                        "total": f"{order['total']} {order['currency_symbol']}",
-                        "date": order['date_created'],
-                        "items": [item['name'] for item in order['line_items']]
-                    })
-            
-            data = {"success": True, "orders": formatted_orders}
-
-        except Exception as e:
-            data = {"success": False, "error": str(e)}
-
-        self.send_response(200)
-        for k, v in cors_headers().items():
-            self.send_header(k, v)
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
@@ -0,0 +1,140 @@
+"""
+Auth Router - SMS Login Codes and Order Status
+Sends one-time codes by SMS and, once a code is verified, returns the
+customer's recent orders. All I/O is async: codes live in the shared asyncio
+Redis client and SMS go through the pooled Flashy client. Sliding-window
+limits per phone, per IP and overall keep SMS spend and guessing bounded.
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+import hmac
+import math
+import secrets
+import logging
+
+from utils.clients import get_async_redis, get_sms_client
+from utils.phone import normalize_phone_il
+from utils.rate_limit import Limit, client_ip, hit, lockout_remaining
+
+from .models import OTPRequest, VerifyOrderRequest
+from .order_lookup import lookup_orders
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+OTP_TTL = 300  # seconds
+
+# (limit, window seconds) for sending codes
+SEND_PER_PHONE = (3, 900)
+SEND_PER_IP = (10, 3600)
+SEND_GLOBAL = (300, 3600)  # Caps total SMS spend even when phones and IPs rotate
+
+# Verification attempts per IP, whatever the phone
+VERIFY_PER_IP = (20, 600)
+
+# Wrong codes for one phone before it is locked (and its code discarded)
+MAX_FAILED_VERIFICATIONS = 5
+FAILED_WINDOW = 900  # seconds
+LOCKOUT_SECONDS = 900
+
+RATE_LIMIT_MESSAGE = "יותר מדי ניסיונות, נסו שוב מאוחר יותר"
+
+
+def otp_key(phone: str) -> str:
+    return f"otp:{phone}"
+
+
+def too_many_requests(retry_after: float) -> JSONResponse:
+    retry_after = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "message": RATE_LIMIT_MESSAGE, "retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def require_redis():
+    redis_client = get_async_redis()
+    if redis_client is None:
+        raise HTTPException(status_code=503, detail="OTP storage unavailable")
+    return redis_client
+
+
+@router.post("/auth/send_otp")
+async def send_otp(body: OTPRequest, request: Request):
+    """Text a 5-digit login code to the phone (valid for 5 minutes)"""
+    phone = normalize_phone_il(body.phone)
+    if not phone:
+        raise HTTPException(status_code=400, detail="Phone required")
+
+    redis_client = require_redis()
+    ip = client_ip(request.headers, request.client.host if request.client else "")
+    limited = await hit(redis_client, [
+        Limit(f"ratelimit:otp_send:phone:{phone}", *SEND_PER_PHONE),
+        Limit(f"ratelimit:otp_send:ip:{ip}", *SEND_PER_IP),
+        Limit("ratelimit:otp_send:global", *SEND_GLOBAL),
+    ])
+    if not limited.allowed:
+        logger.warning(f"OTP send limited by {limited.limit.key}")
+        return too_many_requests(limited.retry_after)
+
+    otp_code = str(10000 + secrets.randbelow(90000))
+
+    try:
+        await redis_client.setex(otp_key(phone), OTP_TTL, otp_code)
+        await get_sms_client().send(phone, f"ShopiPet Code: {otp_code}")
+    except Exception as e:
+        logger.error(f"Send OTP error: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    return {"status": "sent"}
+
+
+@router.post("/auth/verify_order")
+async def verify_order(body: VerifyOrderRequest, request: Request):
+    """
+    Check the login code, then return up to 3 recent orders for the phone
+
+    After MAX_FAILED_VERIFICATIONS wrong codes the phone is locked for
+    LOCKOUT_SECONDS and its code is discarded, so a new one must be sent.
+    """
+    phone = normalize_phone_il(body.phone)
+    redis_client = require_redis()
+    ip = client_ip(request.headers, request.client.host if request.client else "")
+
+    limited = await hit(redis_client, [Limit(f"ratelimit:otp_verify:ip:{ip}", *VERIFY_PER_IP)])
+    if not limited.allowed:
+        logger.warning(f"OTP verify limited by {limited.limit.key}")
+        return too_many_requests(limited.retry_after)
+
+    lock_key = f"ratelimit:otp_lock:{phone}"
+    locked_for = await lockout_remaining(redis_client, lock_key)
+    if locked_for:
+        return too_many_requests(locked_for)
+
+    stored_code = await redis_client.get(otp_key(phone)) if phone else None
+    if not stored_code or not hmac.compare_digest(stored_code.encode(), body.code.strip().encode()):
+        # Allows MAX_FAILED_VERIFICATIONS - 1 failures; the next one locks the phone
+        failures = await hit(redis_client, [
+            Limit(f"ratelimit:otp_fail:{phone}", MAX_FAILED_VERIFICATIONS - 1, FAILED_WINDOW)
+        ])
+        if phone and not failures.allowed:
+            logger.warning(f"Locking OTP verification for {phone[:5]}*** after repeated failures")
+            pipe = redis_client.pipeline()
+            pipe.set(lock_key, "1", ex=LOCKOUT_SECONDS)
+            pipe.delete(otp_key(phone), f"ratelimit:otp_fail:{phone}")
+            await pipe.execute()
+            return too_many_requests(LOCKOUT_SECONDS)
+        return JSONResponse(status_code=401, content={"success": False, "message": "Code Invalid"})
+
+    await redis_client.delete(otp_key(phone), f"ratelimit:otp_fail:{phone}")
+
+    try:
+        # The raw phone is kept for WooCommerce search; cache and index keys normalize it
+        orders = await lookup_orders(body.phone, redis_client)
+    except Exception as e:
+        logger.error(f"Order lookup error: {e}")
+        return {"success": False, "error": str(e)}
+
+    return {"success": True, "orders": orders}
@@ -2,13 +2,33 @@
 Chat Router - FastAPI Implementation
 Handles chat requests with OpenAI Assistant API integration
 """
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import JSONResponse
+import asyncio
+import math
 import os
 import json
 import re
 import time
 import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
+from urllib.parse import urlencode
+
+from utils.admission import (
+    BUSY_MESSAGE, Admission, AdmissionController, is_rate_limit_error, retry_after_seconds
+)
+from utils.citations import strip_citations
+from utils.clients import get_async_openai_client, get_async_redis, get_woocommerce_api
+from utils.batching import BatchLoader, MAX_BATCH_SIZE
+from utils.card_cache import CachedCard, CardCache
+from utils.products import compact_card, format_variations_for_card, parse_card_fields
+from utils.run_scheduler import ThreadBusyError, ThreadRunScheduler, Ticket, merge_messages
+from utils.serialization import FastJSONResponse
+from utils.singleflight import SingleFlight
+from utils.timing import RequestTimer, optional_stage
+from utils.variation_index import load_variation_summaries
 
 from .models import ChatRequest, ChatResponse, Product, ProductVariation
 
@@ -17,211 +37,489 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def get_openai_client():
-    """Get OpenAI client instance"""
-    from openai import OpenAI
+# Identical in-flight WooCommerce requests share one upstream call
+woo_requests = SingleFlight("woo", redis_getter=get_async_redis)
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="Missing OPENAI_API_KEY")
+# One run at a time per thread; messages sent meanwhile join the next run
+run_scheduler = ThreadRunScheduler(redis_getter=get_async_redis)
 
-    return OpenAI(api_key=api_key)
+THREAD_BUSY_MESSAGE = "עדיין מטפל בהודעה הקודמת שלך, נסה שוב בעוד רגע 🙏"
 
+# Longest a run may take before the request gives up on it (under the
+# scheduler's lock TTL, so a run never outlives its thread lock)
+RUN_TIMEOUT = 120  # seconds
 
-def get_woocommerce_api():
-    """Get WooCommerce API instance"""
-    from woocommerce import API
+# Runs being settled after their response went out (strong refs keep the tasks alive)
+_settling: set = set()
 
-    required_vars = ["WOO_BASE_URL", "WOO_CONSUMER_KEY", "WOO_CONSUMER_SECRET"]
-    missing = [var for var in required_vars if not os.getenv(var)]
+# Keeps runs under the OpenAI RPM/TPM limits; ongoing conversations go first
+admission = AdmissionController.from_env(redis_getter=get_async_redis)
 
-    if missing:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Missing WooCommerce config: {', '.join(missing)}"
-        )
 
-    return API(
-        url=os.getenv("WOO_BASE_URL"),
-        consumer_key=os.getenv("WOO_CONSUMER_KEY"),
-        consumer_secret=os.getenv("WOO_CONSUMER_SECRET"),
-        version="wc/v3",
-        timeout=20
+def busy_response(thread_id: Optional[str], retry_after: float, timer: RequestTimer) -> JSONResponse:
+    """503 with a friendly reply when OpenAI capacity is exhausted"""
+    return JSONResponse(
+        status_code=503,
+        content={"reply": BUSY_MESSAGE, "thread_id": thread_id, "action": "busy"},
+        headers={
+            "Retry-After": str(max(1, math.ceil(retry_after))),
+            "Server-Timing": timer.server_timing()
+        }
     )
 
 
-async def fetch_products(product_ids: list[int]) -> list[dict]:
+@dataclass(frozen=True)
+class CardFormat:
+    """
+    How product cards are sent back
+
+    Full cards (the default) match models.Product. Compact cards (see
+    utils.products.compact_card) are requested with `"compact": true`, a
+    `fields` projection or an `X-Card-Format: compact` header, and come with
+    the `base_url` their relative URLs resolve against.
+
+    With `ids_only` only the product IDs are sent; the widget loads the cards
+    from GET /api/products, where the browser and the CDN can cache them.
+    """
+    compact: bool = False
+    fields: frozenset = frozenset()
+    ids_only: bool = False
+
+    @classmethod
+    def negotiate(cls, request: ChatRequest, header: Optional[str] = None) -> "CardFormat":
+        fields = parse_card_fields(request.fields)
+        compact = request.compact or bool(fields) or (header or "").strip().lower() == "compact"
+        return cls(compact=compact, fields=fields, ids_only=request.ids_only)
+
+    @property
+    def key(self) -> tuple:
+        """Identifies the rendering, for memoized encodings and ETags"""
+        if not self.compact:
+            return ("full",)
+        # Sorted, not the frozenset: its order varies with PYTHONHASHSEED
+        return ("compact", (os.getenv("WOO_BASE_URL") or "").rstrip("/"), tuple(sorted(self.fields)))
+
+    async def render(self, product_ids: list, timer: Optional[RequestTimer] = None) -> dict:
+        """The products part of a chat response for the IDs the assistant chose"""
+        if self.ids_only:
+            return {"product_ids": parse_product_ids(product_ids)}
+        return self.payload(await fetch_cards(product_ids, timer))
+
+    def payload(self, cards: list[CachedCard]) -> dict:
+        """
+        Cards and, in compact mode, the store base URL
+
+        Cards are pre-serialized RawJSON (memoized on the cached card), so
+        utils.serialization splices them into the response or SSE frame.
+        """
+        key = self.key
+        if not self.compact:
+            return {"products": [cached.encoded(key, dict) for cached in cards]}
+        _, base_url, fields = key
+        render = partial(compact_card, base_url=base_url, fields=fields)
+        return {
+            "products": [cached.encoded(key, render) for cached in cards],
+            "base_url": base_url
+        }
+
+
+def chat_response(timer: RequestTimer, **fields) -> FastJSONResponse:
+    """
+    A ChatResponse-shaped body, serialized without response_model validation
+
+    Everything in it was built here, so validating it again is wasted work.
     """
-    Fetch product details from WooCommerce
+    return FastJSONResponse(
+        content={"reply": None, "thread_id": None, "action": None, "products": None, **fields},
+        headers={"Server-Timing": timer.server_timing()}
+    )
+
+
+def cached_prompt_tokens(usage) -> Optional[int]:
+    """
+    Prompt tokens OpenAI served from its prompt cache, when reported
+
+    Older SDK versions keep prompt_tokens_details as a plain dict on run
+    usage, newer ones as a model.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens")
+    return getattr(details, "cached_tokens", None)
+
+
+async def record_run_usage(admitted: Optional[Admission], run):
+    """
+    Settle the admission reservation with a finished run's usage and log it
+
+    The assistant's instructions are a fixed prefix stored on the assistant
+    and the thread only grows at the end, so every turn re-sends the previous
+    turn's prompt first; cached_tokens shows how much of it hit the cache.
+    """
+    usage = run.usage
+    if not usage:
+        return
+    if admitted:
+        await admission.record_usage(admitted, usage.total_tokens)
+    logger.info(json.dumps({
+        "event": "run_usage",
+        "run_id": run.id,
+        "status": run.status,
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_tokens": cached_prompt_tokens(usage),
+        "completion_tokens": usage.completion_tokens
+    }))
+
+
+async def cancel_run(client, thread_id: str, run_id: str):
+    """Cancel a run this request no longer waits for (it may have just finished)"""
+    try:
+        await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+        await admission.record_requests()
+    except Exception as e:
+        logger.warning(f"Failed to cancel run {run_id}: {e}")
+
+
+async def settle_cancelled_run(
+    client,
+    thread_id: str,
+    run_id: str,
+    admitted: Optional[Admission],
+    ticket: Optional[Ticket] = None,
+    attempts: int = 10
+):
+    """
+    Wait for a cancelled run to stop, record its tokens and free the thread
+
+    OpenAI only reports usage once the run has reached a terminal state, and
+    rejects new messages on the thread until then, so the thread lock
+    (`ticket`) is held until the run has stopped.
+    """
+    try:
+        for _ in range(attempts):
+            run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+            await admission.record_requests()
+            if run.status in ("cancelled", "completed", "failed", "expired"):
+                await record_run_usage(admitted, run)
+                return
+            await asyncio.sleep(0.5)
+        logger.warning(f"Run {run_id} still cancelling; its token usage was not recorded")
+    except Exception as e:
+        logger.warning(f"Failed to settle cancelled run {run_id}: {e}")
+    finally:
+        if ticket:
+            await run_scheduler.release(ticket)
+
+
+def settle_in_background(
+    client,
+    thread_id: str,
+    run_id: str,
+    admitted: Optional[Admission],
+    ticket: Optional[Ticket] = None
+):
+    """Run settle_cancelled_run after the response, handing it the thread lock"""
+    task = asyncio.create_task(settle_cancelled_run(client, thread_id, run_id, admitted, ticket))
+    _settling.add(task)
+    task.add_done_callback(_settling.discard)
+
+
+async def woo_get(wcapi, endpoint: str, params: dict) -> tuple[int, object]:
+    """
+    GET a WooCommerce endpoint through the single-flight layer
+
+    The blocking HTTP call runs in a worker thread, and concurrent callers
+    asking for the same endpoint and parameters share a single request.
+
+    Returns:
+        (status_code, parsed JSON body on 200 or raw text otherwise)
+    """
+    key = f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    async def call():
+        res = await asyncio.to_thread(wcapi.get, endpoint, params=params)
+        if res.status_code == 200:
+            return [res.status_code, res.json()]
+        return [res.status_code, res.text]
+
+    status_code, body = await woo_requests.do(key, call)
+    return status_code, body
+
+
+async def load_products(product_ids: list[int]) -> dict[int, dict]:
+    """
+    Bulk-load raw WooCommerce products for the batch loader
+
+    Args:
+        product_ids: Up to 100 unique product IDs (union of concurrent requests)
+
+    Returns:
+        Dict of product ID -> raw WooCommerce product
+    """
+    wcapi = get_woocommerce_api()
+    ids_str = ",".join(map(str, sorted(product_ids)))
+    status_code, body = await woo_get(
+        wcapi,
+        "products",
+        {"include": ids_str, "per_page": MAX_BATCH_SIZE}
+    )
+
+    if status_code != 200:
+        raise RuntimeError(f"WooCommerce API error: {status_code} - {body}")
+
+    return {p.get('id'): p for p in body}
+
+
+# Product lookups from concurrent chats are merged into one include= request
+product_loader = BatchLoader(load_products)
+
+# Built cards (and their JSON) are reused across chats for a short time
+card_cache = CardCache()
+
+
+def parse_product_ids(product_ids) -> list[int]:
+    """Unique integer product IDs in their original order; invalid ones are dropped"""
+    requested_ids = []
+    for product_id in product_ids or []:
+        try:
+            requested_ids.append(int(product_id))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid product ID: {product_id!r}")
+    return list(dict.fromkeys(requested_ids))
+
+
+async def fetch_cards(
+    product_ids: list[int],
+    timer: Optional[RequestTimer] = None,
+    raise_errors: bool = False
+) -> list[CachedCard]:
+    """
+    Product cards for the given IDs, from the card cache or WooCommerce
 
     Args:
         product_ids: List of WooCommerce product IDs
+        timer: Optional request timer (records woo_fetch / variation_fetch)
+        raise_errors: Raise WooCommerce errors instead of skipping those cards
 
     Returns:
-        List of product dictionaries with details
+        Cached cards in the order the IDs were given; unknown IDs are skipped
     """
-    if not product_ids:
+    requested_ids = parse_product_ids(product_ids)
+    if not requested_ids:
         return []
 
+    cards = card_cache.get_many(requested_ids)
+    missing = [pid for pid in requested_ids if pid not in cards]
+
+    if missing:
+        try:
+            cards.update(await build_cards(missing, timer))
+        except Exception as e:
+            logger.error(f"Error fetching products: {e}")
+            if raise_errors:
+                raise
+
+    # Keep the order the assistant asked for
+    return [cards[pid] for pid in requested_ids if pid in cards]
+
+
+async def build_cards(product_ids: list[int], timer: Optional[RequestTimer] = None) -> dict[int, CachedCard]:
+    """Build cards for products missing from the card cache and cache them"""
     wcapi = get_woocommerce_api()
-    products_data = []
+    cards = {}
 
-    try:
-        ids_str = ",".join(map(str, product_ids))
-        res = wcapi.get("products", params={"include": ids_str})
-
-        if res.status_code != 200:
-            logger.error(f"WooCommerce API error: {res.status_code} - {res.text}")
-            return []
-
-        for p in res.json():
-            # Extract image
-            img_src = ""
-            if p.get('images') and len(p['images']) > 0:
-                img_src = p['images'][0]['src']
-
-            # Clean HTML from short_description
-            short_desc = p.get('short_description', '')
-            if short_desc:
-                short_desc = re.sub(r'<[^>]+>', '', short_desc)
-                short_desc = ' '.join(short_desc.split())
-
-            # Get SKU
-            sku = p.get('sku', '')
-
-            # Check product type and fetch variations
-            product_type = p.get('type', 'simple')
-            variations = []
-            in_stock_variations = []
-
-            if product_type == 'variable':
+    with optional_stage(timer, "woo_fetch"):
+        raw_products = await product_loader.load_many(product_ids)
+
+    with optional_stage(timer, "variation_fetch"):
+        indexed_variations = await load_variation_summaries(
+            get_async_redis(),
+            [p.get('id') for p in raw_products.values() if p.get('type') == 'variable']
+        )
+
+    for p in raw_products.values():
+        # Extract image
+        img_src = ""
+        if p.get('images') and len(p['images']) > 0:
+            img_src = p['images'][0]['src']
+
+        # Clean HTML from short_description
+        short_desc = p.get('short_description', '')
+        if short_desc:
+            short_desc = re.sub(r'<[^>]+>', '', short_desc)
+            short_desc = ' '.join(short_desc.split())
+
+        # Get SKU
+        sku = p.get('sku', '')
+
+        # Variable products: card variations come from the sync-time index,
+        # with a live WooCommerce fetch only for products missing from it
+        product_type = p.get('type', 'simple')
+        variation_summary = {"variations": [], "has_more_variations": False}
+        variations_failed = False
+
+        if product_type == 'variable':
+            if p.get('id') in indexed_variations:
+                variation_summary = indexed_variations[p.get('id')]
+            else:
                 try:
-                    var_res = wcapi.get(
-                        f"products/{p.get('id')}/variations",
-                        params={"per_page": 100}
-                    )
-
-                    if var_res.status_code == 200:
-                        all_variations = var_res.json()
-
-                        # Filter only in-stock variations
-                        in_stock_variations = [
-                            v for v in all_variations
-                            if v.get('stock_status') == 'instock' and v.get('purchasable', True)
-                        ]
-
-                        # Limit to first 3 variations
-                        for v in in_stock_variations[:3]:
-                            var_name = v.get('name', '')
-                            attributes = v.get('attributes', [])
-                            attr_text = ', '.join([
-                                f"{a.get('name')}: {a.get('option')}"
-                                for a in attributes if a.get('option')
-                            ])
-
-                            variations.append({
-                                "id": v.get('id'),
-                                "name": attr_text or var_name,
-                                "price": f"{v.get('price')} ₪",
-                                "regular_price": f"{v.get('regular_price')} ₪",
-                                "sale_price": f"{v.get('sale_price')} ₪" if v.get('sale_price') else "",
-                                "on_sale": v.get('on_sale', False),
-                                "sku": v.get('sku', '')
-                            })
+                    with optional_stage(timer, "variation_fetch"):
+                        var_status, all_variations = await woo_get(
+                            wcapi,
+                            f"products/{p.get('id')}/variations",
+                            {"per_page": 100}
+                        )
+
+                    if var_status == 200:
+                        variation_summary = format_variations_for_card(all_variations)
+                    else:
+                        variations_failed = True
                 except Exception as var_e:
                     logger.error(f"Variation fetch error: {var_e}")
+                    variations_failed = True
+
+        card = {
+            "id": p.get('id'),
+            "name": p.get('name'),
+            "sku": sku,
+            "price": f"{p.get('price')} ₪",
+            "regular_price": f"{p.get('regular_price')} ₪",
+            "sale_price": f"{p.get('sale_price')} ₪",
+            "on_sale": p.get('on_sale', False),
+            "image": img_src,
+            "short_description": short_desc,
+            "permalink": p.get('permalink'),
+            "add_to_cart_url": f"{os.getenv('WOO_BASE_URL')}/?add-to-cart={p.get('id')}",
+            "type": product_type,
+            "variations": variation_summary["variations"],
+            "has_more_variations": variation_summary["has_more_variations"]
+        }
+        cards[card["id"]] = card_cache.put(
+            card, p.get('date_modified_gmt') or p.get('date_modified'), partial=variations_failed
+        )
 
-            products_data.append({
-                "id": p.get('id'),
-                "name": p.get('name'),
-                "sku": sku,
-                "price": f"{p.get('price')} ₪",
-                "regular_price": f"{p.get('regular_price')} ₪",
-                "sale_price": f"{p.get('sale_price')} ₪",
-                "on_sale": p.get('on_sale', False),
-                "image": img_src,
-                "short_description": short_desc,
-                "permalink": p.get('permalink'),
-                "add_to_cart_url": f"{os.getenv('WOO_BASE_URL')}/?add-to-cart={p.get('id')}",
-                "type": product_type,
-                "variations": variations,
-                "has_more_variations": product_type == 'variable' and len(in_stock_variations) > 3
-            })
-
-    except Exception as e:
-        logger.error(f"Error fetching products: {e}")
-
-    return products_data
+    return cards
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_card_format: Optional[str] = Header(None)):
     """
     Handle chat messages with OpenAI Assistant API
 
-    This endpoint uses polling (will be upgraded to streaming in Phase 2)
+    This endpoint uses polling (will be upgraded to streaming in Phase 2).
+    Stage timings are returned in the Server-Timing header.
+
+    Messages on a thread that already has an active run wait for it and are
+    sent together in the next run; a request whose message was sent by
+    another request gets action="merged" and no reply.
+
+    When the OpenAI quota is exhausted the request is answered with a 503,
+    action="busy" and a short Hebrew reply instead of failing.
+
+    Product cards are sent compact when the request asks for it (see CardFormat).
+
+    Every poll of the run counts against the OpenAI request window. Runs the
+    request stops waiting for (show_products, timeout, errors) are cancelled,
+    and the thread is only freed once OpenAI reports them stopped, with
+    their tokens recorded.
     """
+    timer = RequestTimer("chat")
+    card_format = CardFormat.negotiate(request, x_card_format)
+    thread_id = request.thread_id
+    user_message = request.message
+    ticket = None
+    admitted: Optional[Admission] = None
+    run = None  # Until it finishes or is cancelled
+
     try:
-        client = get_openai_client()
+        client = get_async_openai_client()
         assistant_id = os.getenv("OPENAI_ASSISTANT_ID")
 
         if not assistant_id:
             raise HTTPException(status_code=500, detail="Missing OPENAI_ASSISTANT_ID")
 
+        with timer.stage("admission"):
+            admitted = await admission.admit(request.message, existing_conversation=bool(thread_id))
+        if not admitted.admitted:
+            return busy_response(thread_id, admitted.retry_after, timer)
+
         # Create or use existing thread
-        thread_id = request.thread_id
         if not thread_id:
-            thread = client.beta.threads.create()
+            with timer.stage("thread_create"):
+                thread = await client.beta.threads.create()
             thread_id = thread.id
+        else:
+            # Wait for any active run on this thread
+            with timer.stage("queue_wait"):
+                ticket = await run_scheduler.enqueue(thread_id, user_message)
+                try:
+                    messages = await run_scheduler.acquire(ticket)
+                except ThreadBusyError:
+                    raise HTTPException(status_code=409, detail=THREAD_BUSY_MESSAGE)
+
+            if messages is None:
+                return chat_response(timer, action="merged", thread_id=thread_id)
+            user_message = merge_messages(messages)
 
         # Add user message to thread
-        client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content=request.message
-        )
+        with timer.stage("message_create"):
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_message
+            )
 
         # Create run
-        run = client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=assistant_id
-        )
+        with timer.stage("run_start"):
+            run = await client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant_id
+            )
 
         # Polling loop with timeout (will be replaced with streaming in Phase 2)
         start_time = time.time()
-        timeout = 120  # 2 minutes
 
         while True:
-            # Timeout protection
-            if time.time() - start_time > timeout:
+            # Timeout protection (the run is cancelled on the way out)
+            if time.time() - start_time > RUN_TIMEOUT:
+                timer.record("run_wait", time.time() - start_time)
                 return JSONResponse(
                     status_code=408,
                     content={
                         "reply": "הפעולה לקחה יותר מדי זמן (Timeout). נסה שוב.",
                         "thread_id": thread_id
-                    }
+                    },
+                    headers={"Server-Timing": timer.server_timing()}
                 )
 
             # Check run status
-            run_status = client.beta.threads.runs.retrieve(
+            run_status = await client.beta.threads.runs.retrieve(
                 thread_id=thread_id,
                 run_id=run.id
             )
+            await admission.record_requests()
+            if ticket:
+                await run_scheduler.renew(ticket)
 
             if run_status.status == 'completed':
+                run = None
+                timer.record("run_wait", time.time() - start_time)
+                await record_run_usage(admitted, run_status)
+
                 # Get the assistant's response
-                msgs = client.beta.threads.messages.list(thread_id=thread_id)
+                with timer.stage("messages_list"):
+                    msgs = await client.beta.threads.messages.list(thread_id=thread_id)
+                await admission.record_requests()
                 reply = msgs.data[0].content[0].text.value
 
                 # Clean citation markers
-                reply = re.sub(r'【.*?】', '', reply)
+                reply = strip_citations(reply)
 
-                return ChatResponse(
-                    reply=reply,
-                    thread_id=thread_id
-                )
+                return chat_response(timer, reply=reply, thread_id=thread_id)
 
             elif run_status.status == 'requires_action':
+                timer.record("run_wait", time.time() - start_time)
+
                 # Handle tool calls (e.g., show_products)
                 tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
 
@@ -232,44 +530,51 @@ async def chat(request: ChatRequest):
                         product_ids = args.get("product_ids", [])
 
                         # Fetch products from WooCommerce
-                        products_data = await fetch_products(product_ids)
-
-                        # Cancel the run (we're returning products directly)
-                        client.beta.threads.runs.cancel(
+                        with timer.stage("tool_show_products"):
+                            products = await card_format.render(product_ids, timer)
+
+                        # Cancel the run (we're returning products directly);
+                        # the thread is freed once it has stopped
+                        with timer.stage("run_cancel"):
+                            await client.beta.threads.runs.cancel(
+                                thread_id=thread_id,
+                                run_id=run.id
+                            )
+                        await admission.record_requests()
+                        settle_in_background(client, thread_id, run.id, admitted, ticket)
+                        run = ticket = None
+
+                        return chat_response(
+                            timer,
+                            reply="מצאתי את המוצרים הבאים:",
                             thread_id=thread_id,
-                            run_id=run.id
-                        )
-
-                        return ChatResponse(
                             action="show_products",
-                            products=products_data,
-                            reply="מצאתי את המוצרים הבאים:",
-                            thread_id=thread_id
+                            **products
                         )
 
             elif run_status.status in ['failed', 'expired', 'cancelled']:
+                run = None
                 error_msg = run_status.last_error.message if run_status.last_error else "Unknown AI Error"
                 raise HTTPException(status_code=500, detail=f"AI Error: {error_msg}")
 
             # Wait before next poll
-            time.sleep(0.5)
+            await asyncio.sleep(0.5)
 
     except HTTPException:
         raise
     except Exception as e:
+        if is_rate_limit_error(e):
+            logger.warning(f"OpenAI rate limit hit: {e}")
+            retry_after = retry_after_seconds(e)
+            await admission.rate_limited(retry_after)
+            return busy_response(thread_id, retry_after or 1, timer)
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.options("/chat")
-async def chat_options():
-    """Handle CORS preflight for chat endpoint"""
-    return JSONResponse(
-        content={"status": "ok"},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-            "Access-Control-Max-Age": "3600"
-        }
-    )
+    finally:
+        if run:
+            # Timed out or failed mid-run: the thread is busy until the run stops
+            await cancel_run(client, thread_id, run.id)
+            settle_in_background(client, thread_id, run.id, admitted, ticket)
+        elif ticket:
+            await run_scheduler.release(ticket)
+        timer.finish(thread_id=thread_id)
@@ -2,74 +2,159 @@
 Streaming Chat Router - FastAPI Implementation with OpenAI Streaming
 This replaces the polling mechanism with real-time streaming responses
 """
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
 import os
 import json
-import re
+import math
+import time
 import logging
-from typing import AsyncGenerator
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
+
+from utils.admission import BUSY_MESSAGE, Admission, is_rate_limit_error, retry_after_seconds
+from utils.citations import CitationFilter
+from utils.clients import get_async_openai_client, get_async_redis
+from utils.run_scheduler import ThreadBusyError, Ticket, merge_messages
+from utils.sse import SSEFramer, parse_last_event_id, sse_frames
+from utils.stream_buffer import StreamBuffer, buffered_frames, get_stream_buffer
+from utils.timing import RequestTimer, optional_stage
 
 from .models import ChatRequest
-from .chat_router import get_openai_client, get_woocommerce_api, fetch_products
+from .chat_router import (
+    CardFormat, RUN_TIMEOUT, THREAD_BUSY_MESSAGE, admission, cancel_run, record_run_usage, run_scheduler,
+    settle_in_background
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Events after which no more text deltas belong to the current message
+TEXT_BOUNDARY_EVENTS = (
+    "thread.message.completed",
+    "thread.run.requires_action",
+    "thread.run.completed",
+    "thread.run.failed",
+    "thread.run.expired",
+    "thread.run.cancelled",
+)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+}
+
+
+def busy_event(retry_after: float) -> dict:
+    return {'type': 'busy', 'message': BUSY_MESSAGE, 'retry_after': retry_after}
+
+
+def busy_stream(retry_after: float, last_event_id: Optional[str] = None) -> StreamingResponse:
+    """A one-event stream telling the shopper to retry shortly"""
+    async def events():
+        yield busy_event(retry_after)
+
+    framer = SSEFramer(last_event_id=parse_last_event_id(last_event_id))
+    return StreamingResponse(
+        sse_frames(events(), framer),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
 
-async def stream_chat_response(
+
+async def chat_events(
     client,
     thread_id: str,
     assistant_id: str,
-    user_message: str
-) -> AsyncGenerator[str, None]:
+    user_message: str,
+    timer: Optional[RequestTimer] = None,
+    admitted: Optional[Admission] = None,
+    card_format: CardFormat = CardFormat(),
+    ticket: Optional[Ticket] = None
+) -> AsyncGenerator[dict, None]:
     """
-    Stream chat responses from OpenAI Assistant API
-
-    Yields Server-Sent Events (SSE) formatted chunks:
-    - data: {"type": "text", "content": "..."} for text deltas
-    - data: {"type": "products", "data": [...]} for product displays
-    - data: {"type": "done", "thread_id": "..."} when complete
+    Run the assistant on a thread and yield chat events as dicts
+
+    Event shapes:
+    - {"type": "text", "content": "..."} for text deltas
+    - {"type": "products", "data": [...]} for product displays, plus
+      "base_url" when card_format is compact, or "product_ids" (and empty
+      data) when it is ids_only
+    - {"type": "done", "thread_id": "..."} when complete
+    - {"type": "busy", "message": "...", "retry_after": s} on an OpenAI 429
+    - {"type": "error", "message": "..."} on failure
+
+    When a timer is given, pipeline stages are recorded on it and it is
+    finished (logged) when the run ends.
+
+    The run is given RUN_TIMEOUT seconds. A run left unfinished (timeout,
+    error, or the generator closed on disconnect) is cancelled. Cancelled
+    runs are settled in the background: the thread lock `ticket`, renewed
+    while the run streams, is released once the run has stopped.
     """
+    first_token = True
+    active_run_id = None  # Started and not yet finished or cancelled
+    cancelled_run_id = None
+    deadline = time.monotonic() + RUN_TIMEOUT
+
     try:
         # Add user message to thread
-        await client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content=user_message
-        )
+        with optional_stage(timer, "message_create"):
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_message
+            )
 
         # Create streaming run
+        run_start = time.perf_counter()
         async with client.beta.threads.runs.stream(
             thread_id=thread_id,
             assistant_id=assistant_id,
             event_handler=None  # We'll handle events manually
         ) as stream:
+            if timer:
+                timer.record("run_start", time.perf_counter() - run_start)
 
-            accumulated_text = ""
+            # Citation markers can be split across deltas, so strip them statefully
+            citations = CitationFilter()
 
             async for event in stream:
                 event_type = event.event
 
+                if event_type == "thread.run.created":
+                    active_run_id = event.data.id
+                if ticket:
+                    await run_scheduler.renew(ticket)
+                if time.monotonic() > deadline:
+                    yield {'type': 'error', 'message': 'Run timed out'}
+                    break
+
                 # Handle text deltas (streaming text response)
                 if event_type == "thread.message.delta":
                     delta = event.data.delta
                     if delta.content:
                         for content_block in delta.content:
                             if hasattr(content_block, 'text') and content_block.text:
-                                text_delta = content_block.text.value
+                                text_delta = citations.feed(content_block.text.value)
+                                if text_delta:
+                                    if first_token and timer:
+                                        timer.mark("first_token")
+                                    first_token = False
+                                    yield {'type': 'text', 'content': text_delta}
 
-                                # Clean citation markers
-                                text_delta = re.sub(r'【.*?】', '', text_delta)
+                    continue
 
-                                accumulated_text += text_delta
-
-                                # Yield text delta to frontend
-                                yield f"data: {json.dumps({'type': 'text', 'content': text_delta})}\n\n"
+                # Release text held back by an unclosed bracket once the message ends
+                if event_type in TEXT_BOUNDARY_EVENTS:
+                    held_text = citations.flush()
+                    if held_text:
+                        yield {'type': 'text', 'content': held_text}
 
                 # Handle tool calls (e.g., show_products)
-                elif event_type == "thread.run.requires_action":
+                if event_type == "thread.run.requires_action":
                     run = event.data
                     tool_calls = run.required_action.submit_tool_outputs.tool_calls
 
@@ -80,41 +165,154 @@ async def stream_chat_response(
                             product_ids = args.get("product_ids", [])
 
                             # Fetch products from WooCommerce
-                            products_data = await fetch_products(product_ids)
+                            with optional_stage(timer, "tool_show_products"):
+                                products = await card_format.render(product_ids, timer)
 
-                            # Yield products event
-                            yield f"data: {json.dumps({'type': 'products', 'data': products_data})}\n\n"
+                            yield {'type': 'products', 'data': products.pop('products', []), **products}
 
                             # Cancel the run since we're handling products client-side
                             await client.beta.threads.runs.cancel(
                                 thread_id=thread_id,
                                 run_id=run.id
                             )
+                            await admission.record_requests()
+                            active_run_id = None
+                            cancelled_run_id = run.id
                             break
 
                 # Handle completion
                 elif event_type == "thread.run.completed":
-                    yield f"data: {json.dumps({'type': 'done', 'thread_id': thread_id})}\n\n"
+                    active_run_id = None
+                    await record_run_usage(admitted, event.data)
+                    yield {'type': 'done', 'thread_id': thread_id}
                     break
 
                 # Handle errors
                 elif event_type == "thread.run.failed":
+                    active_run_id = None
                     run = event.data
                     error_msg = run.last_error.message if run.last_error else "Unknown error"
-                    yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
+                    yield {'type': 'error', 'message': error_msg}
                     break
 
                 elif event_type in ["thread.run.expired", "thread.run.cancelled"]:
-                    yield f"data: {json.dumps({'type': 'error', 'message': 'Run was cancelled or expired'})}\n\n"
+                    active_run_id = None
+                    yield {'type': 'error', 'message': 'Run was cancelled or expired'}
                     break
 
+        if cancelled_run_id:
+            # The products are out: end the turn for the widget
+            yield {'type': 'done', 'thread_id': thread_id}
+
     except Exception as e:
-        logger.error(f"Streaming error: {e}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        if is_rate_limit_error(e):
+            logger.warning(f"OpenAI rate limit hit: {e}")
+            retry_after = retry_after_seconds(e)
+            await admission.rate_limited(retry_after)
+            yield busy_event(retry_after or 1)
+        else:
+            logger.error(f"Streaming error: {e}")
+            yield {'type': 'error', 'message': str(e)}
+
+    finally:
+        if active_run_id:
+            # The thread takes no new message until this run has stopped
+            await cancel_run(client, thread_id, active_run_id)
+            settle_in_background(client, thread_id, active_run_id, admitted, ticket)
+        elif cancelled_run_id:
+            # Record the cancelled run's tokens and free the thread after the
+            # response, without holding the stream open while OpenAI catches up
+            settle_in_background(client, thread_id, cancelled_run_id, admitted, ticket)
+        elif ticket:
+            await run_scheduler.release(ticket)
+        if timer:
+            timer.finish(thread_id=thread_id)
+
+
+async def stream_chat_response(
+    client,
+    thread_id: str,
+    assistant_id: str,
+    user_message: str,
+    framer: Optional[SSEFramer] = None,
+    announce_thread: bool = False,
+    stream_id: Optional[str] = None,
+    timer: Optional[RequestTimer] = None,
+    admitted: Optional[Admission] = None,
+    card_format: CardFormat = CardFormat()
+) -> AsyncGenerator[str, None]:
+    """
+    Stream chat responses from OpenAI Assistant API as Server-Sent Events
+
+    Text deltas are coalesced into larger frames (see utils.sse), every data
+    frame carries an event ID, and heartbeat comments keep the connection
+    alive while a tool call is being served.
+
+    On an existing thread the run waits for any active run first: the client
+    gets {"type": "queued", "position": n} while it waits, and
+    {"type": "merged", "thread_id": ...} if its message went out with another
+    request's run instead.
+
+    Args:
+        announce_thread: Send the thread ID first so the frontend can store it
+        stream_id: ID of the resumable buffer this response is written to
+    """
+    async def events():
+        if stream_id:
+            yield {'type': 'stream', 'stream_id': stream_id}
+        if announce_thread:
+            yield {'type': 'thread_id', 'thread_id': thread_id}
+            # A brand-new thread cannot have another run on it
+            async for event in chat_events(
+                client, thread_id, assistant_id, user_message, timer, admitted, card_format
+            ):
+                yield event
+            return
+
+        queue_start = time.perf_counter()
+        ticket = await run_scheduler.enqueue(thread_id, user_message)
+        run_started = False
+        try:
+            if not ticket.acquired:
+                yield {'type': 'queued', 'position': ticket.position}
+
+            try:
+                messages = await run_scheduler.acquire(ticket)
+            except ThreadBusyError:
+                yield {'type': 'error', 'message': THREAD_BUSY_MESSAGE}
+                return
+            finally:
+                if timer:
+                    timer.record("queue_wait", time.perf_counter() - queue_start)
+
+            if messages is None:
+                yield {'type': 'merged', 'thread_id': thread_id}
+                return
+
+            # chat_events frees the thread once its run has stopped; closing it
+            # here (not on garbage collection) cancels an abandoned run first
+            run_started = True
+            async with aclosing(chat_events(
+                client, thread_id, assistant_id, merge_messages(messages), timer, admitted, card_format, ticket
+            )) as run_events:
+                async for event in run_events:
+                    yield event
+        finally:
+            if not run_started:
+                await run_scheduler.release(ticket)
+            if timer:
+                timer.finish(thread_id=thread_id)  # No-op if the run already finished it
+
+    async for frame in sse_frames(events(), framer):
+        yield frame
 
 
 @router.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(
+    request: ChatRequest,
+    last_event_id: Optional[str] = Header(None),
+    x_card_format: Optional[str] = Header(None)
+):
     """
     Streaming chat endpoint using Server-Sent Events (SSE)
 
@@ -123,71 +321,109 @@ async def chat_stream(request: ChatRequest):
     - Product data when show_products is called
     - Completion signal when done
 
+    When Redis is configured, the first event is {"type": "stream", "stream_id": ...}
+    and every frame is also written to a short-lived buffer. If the connection
+    drops, the client resumes with GET /api/chat/stream/{stream_id} instead of
+    re-posting the message, so no new run is started.
+
+    Stages that finish before the stream starts are sent in the
+    Server-Timing header; the full breakdown is logged and exported on
+    /api/metrics when the run ends.
+
+    When the OpenAI quota is exhausted the stream is a single
+    {"type": "busy", ...} event with a short Hebrew message.
+
+    Product cards are sent compact when the request asks for it (see
+    chat_router.CardFormat).
+
     Frontend should use EventSource or fetch with stream processing
     """
+    timer = RequestTimer("chat_stream")
+
     try:
-        client = get_openai_client()
+        client = get_async_openai_client()
         assistant_id = os.getenv("OPENAI_ASSISTANT_ID")
 
         if not assistant_id:
             raise HTTPException(status_code=500, detail="Missing OPENAI_ASSISTANT_ID")
 
+        with timer.stage("admission"):
+            admitted = await admission.admit(request.message, existing_conversation=bool(request.thread_id))
+        if not admitted.admitted:
+            timer.finish(thread_id=request.thread_id, shed=True)
+            return busy_stream(admitted.retry_after, last_event_id)
+
         # Create or use existing thread
         thread_id = request.thread_id
-        if not thread_id:
-            thread = await client.beta.threads.create()
+        is_new_thread = not thread_id
+        if is_new_thread:
+            with timer.stage("thread_create"):
+                thread = await client.beta.threads.create()
             thread_id = thread.id
 
-            # Send thread_id immediately so frontend can store it
-            async def init_stream():
-                yield f"data: {json.dumps({'type': 'thread_id', 'thread_id': thread_id})}\n\n"
-                async for chunk in stream_chat_response(
-                    client, thread_id, assistant_id, request.message
-                ):
-                    yield chunk
-
-            return StreamingResponse(
-                init_stream(),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "X-Accel-Buffering": "no",  # Disable nginx buffering
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type"
-                }
-            )
-        else:
-            return StreamingResponse(
-                stream_chat_response(client, thread_id, assistant_id, request.message),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "X-Accel-Buffering": "no",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type"
-                }
-            )
+        framer = SSEFramer(last_event_id=parse_last_event_id(last_event_id))
+        buffer = get_stream_buffer(get_async_redis())
+
+        frames = stream_chat_response(
+            client, thread_id, assistant_id, request.message,
+            framer=framer,
+            announce_thread=is_new_thread,
+            stream_id=buffer.stream_id if buffer else None,
+            timer=timer,
+            admitted=admitted,
+            card_format=CardFormat.negotiate(request, x_card_format)
+        )
+        if buffer:
+            frames = buffered_frames(frames, buffer)
+
+        headers = dict(SSE_HEADERS)
+        if timer.stages:
+            headers["Server-Timing"] = timer.server_timing(include_total=False)
+
+        return StreamingResponse(
+            frames,
+            media_type="text/event-stream",
+            headers=headers
+        )
 
     except HTTPException:
         raise
     except Exception as e:
+        if is_rate_limit_error(e):
+            logger.warning(f"OpenAI rate limit hit: {e}")
+            retry_after = retry_after_seconds(e)
+            await admission.rate_limited(retry_after)
+            timer.finish(thread_id=request.thread_id, shed=True)
+            return busy_stream(retry_after or 1, last_event_id)
         logger.error(f"Chat stream error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.options("/chat/stream")
-async def chat_stream_options():
-    """Handle CORS preflight for streaming endpoint"""
-    return JSONResponse(
-        content={"status": "ok"},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-            "Access-Control-Max-Age": "3600"
-        }
+@router.get("/chat/stream/{stream_id}")
+async def chat_stream_resume(
+    stream_id: str,
+    last_event_id: Optional[str] = Header(None),
+    last_event_id_param: Optional[str] = Query(None, alias="last_event_id")
+):
+    """
+    Resume a streaming response after a dropped connection
+
+    Replays buffered frames after Last-Event-ID (header, or `last_event_id`
+    query parameter for clients that cannot set headers), then follows the
+    live tail until the run finishes. Costs nothing upstream.
+    """
+    redis_client = get_async_redis()
+    if redis_client is None:
+        raise HTTPException(status_code=404, detail="Stream resume is not available")
+
+    buffer = StreamBuffer(redis_client, stream_id)
+    if not await buffer.exists():
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+
+    resume_from = parse_last_event_id(last_event_id or last_event_id_param)
+
+    return StreamingResponse(
+        buffer.replay(resume_from),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
     )
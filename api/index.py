@@ -2,13 +2,16 @@
 ShopiPet ChatKit - FastAPI Entry Point
 Main application with CORS, global exception handling, and router registration.
 """
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from utils.startup import import_phase, mark_ready
+
+with import_phase("fastapi"):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, PlainTextResponse
 import traceback
 import logging
 
+from utils.cors import CORSMiddleware
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,43 +23,8 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# Custom CORS middleware to ensure headers are always added
-class CustomCORSMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Handle preflight requests
-        if request.method == "OPTIONS":
-            return JSONResponse(
-                content={},
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-                    "Access-Control-Allow-Headers": "*",
-                    "Access-Control-Max-Age": "3600",
-                }
-            )
-
-        # Process the request
-        response = await call_next(request)
-
-        # Add CORS headers to response
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-
-        return response
-
-# Add custom CORS middleware
-app.add_middleware(CustomCORSMiddleware)
-
-# Also add FastAPI CORS middleware as backup
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"]
-)
+# CORS: one pure ASGI layer (preflights answered before routing, streams untouched)
+app.add_middleware(CORSMiddleware)
 
 
 # Global exception handler
@@ -80,20 +48,6 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-# Global OPTIONS handler for all routes
-@app.options("/{path:path}")
-async def options_handler(path: str):
-    """Handle all OPTIONS requests globally"""
-    return JSONResponse(
-        content={},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Max-Age": "86400"
-        }
-    )
-
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -112,15 +66,25 @@ async def api_root():
         "status": "ok",
         "endpoints": {
             "chat": "/api/chat",
+            "products": "/api/products",
             "sync": "/api/sync",
-            "health": "/api/health"
+            "orders_webhook": "/api/orders/webhook",
+            "health": "/api/health",
+            "metrics": "/api/metrics"
         }
     }
 
 
 @app.get("/api/health")
-async def health_check():
-    """Detailed health check endpoint"""
+async def health_check(clients: bool = False, imports: bool = False):
+    """
+    Detailed health check endpoint
+
+    Query params:
+        clients: Report warm shared clients and ping Redis
+        imports: Include the in-process cold start profile
+        (the `-X importtime` breakdown is CLI-only: python -m utils.startup)
+    """
     import os
 
     # Check required environment variables
@@ -134,34 +98,107 @@ async def health_check():
 
     missing_vars = [var for var in required_vars if not os.getenv(var)]
 
-    return {
+    result = {
         "status": "healthy" if not missing_vars else "degraded",
         "environment": "configured" if not missing_vars else "incomplete",
         "missing_vars": missing_vars if missing_vars else None
     }
 
+    if clients:
+        from utils.clients import check_clients
+        result["clients"] = await check_clients()
 
-# Import and register routers
-try:
-    from .chat_router import router as chat_router
-    app.include_router(chat_router, prefix="/api", tags=["chat"])
-except ImportError as e:
-    logger.warning(f"Chat router not available: {e}")
+    if imports:
+        from utils.startup import startup_report
+        result["startup"] = startup_report()
+
+    return result
 
-try:
-    from .chat_streaming import router as chat_streaming_router
-    app.include_router(chat_streaming_router, prefix="/api", tags=["chat-streaming"])
-except ImportError as e:
-    logger.warning(f"Streaming chat router not available: {e}")
 
-try:
-    from .sync_router import router as sync_router
-    app.include_router(sync_router, prefix="/api", tags=["sync"])
-except ImportError as e:
-    logger.warning(f"Sync router not available: {e}")
+@app.get("/api/metrics")
+async def metrics_endpoint():
+    """Chat pipeline latency histograms in Prometheus text format"""
+    from utils.timing import metrics
+
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# Import and register routers
+with import_phase("chat_router"):
+    try:
+        from .chat_router import router as chat_router
+        app.include_router(chat_router, prefix="/api", tags=["chat"])
+    except ImportError as e:
+        logger.warning(f"Chat router not available: {e}")
+
+with import_phase("chat_streaming"):
+    try:
+        from .chat_streaming import router as chat_streaming_router
+        app.include_router(chat_streaming_router, prefix="/api", tags=["chat-streaming"])
+    except ImportError as e:
+        logger.warning(f"Streaming chat router not available: {e}")
+
+with import_phase("products_router"):
+    try:
+        from .products_router import router as products_router
+        app.include_router(products_router, prefix="/api", tags=["products"])
+    except ImportError as e:
+        logger.warning(f"Products router not available: {e}")
+
+with import_phase("auth_router"):
+    try:
+        from .auth_router import router as auth_router
+        app.include_router(auth_router, prefix="/api", tags=["auth"])
+    except ImportError as e:
+        logger.warning(f"Auth router not available: {e}")
+
+with import_phase("legacy_router"):
+    try:
+        from .legacy_router import router as legacy_router
+        app.include_router(legacy_router, prefix="/api", tags=["legacy"])
+    except ImportError as e:
+        logger.warning(f"Legacy router not available: {e}")
+
+with import_phase("orders_router"):
+    try:
+        from .orders_router import router as orders_router
+        app.include_router(orders_router, prefix="/api", tags=["orders"])
+    except ImportError as e:
+        logger.warning(f"Orders router not available: {e}")
+
+
+# Sync runs once a day from cron, so its router is only imported when called
+from .models import SyncJobStatus, SyncResponse
+
+
+@app.get("/api/sync", response_model=SyncResponse, tags=["sync"])
+async def sync_catalog(request: Request):
+    """Start a catalog sync job (see sync_router.sync_catalog)"""
+    from .sync_router import sync_catalog as start_sync
+    return await start_sync(request)
+
+
+@app.post("/api/sync/jobs/{job_id}/step", response_model=SyncJobStatus, tags=["sync"])
+async def sync_step(job_id: str, request: Request):
+    """Advance a sync job by one step (see sync_router.sync_step)"""
+    from .sync_router import sync_step as run_step
+    return await run_step(job_id, request)
+
+
+@app.get("/api/sync/jobs/{job_id}", response_model=SyncJobStatus, tags=["sync"])
+async def sync_status(job_id: str):
+    """Sync job progress (see sync_router.sync_status)"""
+    from .sync_router import sync_status as job_status
+    return await job_status(job_id)
 
 
 # For Vercel serverless deployment
 # Use Mangum to wrap FastAPI for AWS Lambda/Vercel compatibility
-from mangum import Mangum
+with import_phase("mangum"):
+    from mangum import Mangum
 handler = Mangum(app, lifespan="off")
+
+mark_ready()
@@ -0,0 +1,54 @@
+"""
+Legacy Router - Compatibility Routes
+Endpoints that used to be standalone BaseHTTPRequestHandler functions
+(api/ping.py, api/run.py), kept with their old response shapes but served by
+the FastAPI app so they share its clients, caches and instrumentation.
+/api/chat and /api/sync are served by chat_router and sync_router directly.
+"""
+from fastapi import APIRouter, HTTPException, Request
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/ping")
+async def ping():
+    """Liveness check"""
+    return {"status": "ok", "service": "ShopiPet ChatKit"}
+
+
+@router.get("/run")
+async def run_sync(request: Request):
+    """
+    Old one-shot catalog upload, now a trigger for the regular sync job
+
+    Returns, with HTTP 200 in every case, as api/run.py did:
+        {"status": "success", "products": n, "filename": "run.py",
+         "version": "...", "job_id": "...", "sync_status": "..."}
+        {"status": "warning", "msg": "No products found"} when a sync that
+        ran inline found an empty catalog
+        {"status": "error", "error": "...", "trace": "..."} on failure
+    """
+    from .sync_router import sync_catalog
+
+    try:
+        result = await sync_catalog(request)
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        return {"status": "error", "error": error, "trace": traceback.format_exc()}
+
+    # Inline syncs report their final count; background jobs have only started
+    if result.status in ("success", "skipped") and not result.products_count:
+        return {"status": "warning", "msg": "No products found"}
+
+    return {
+        "status": "success",
+        "products": result.products_count,
+        "filename": "run.py",
+        "version": "DIRECT GITHUB UPLOAD",
+        "job_id": result.job_id,
+        "sync_status": result.status
+    }
@@ -2,19 +2,26 @@
 Pydantic models for request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str = Field(..., min_length=1, max_length=10000, description="User message")
     thread_id: Optional[str] = Field(None, description="OpenAI thread ID for conversation continuity")
+    compact: bool = Field(False, description="Send compact product cards (also X-Card-Format: compact)")
+    fields: Optional[str] = Field(
+        None, max_length=200,
+        description="Comma-separated compact card fields to send, e.g. \"name,price,url\" (implies compact)"
+    )
+    ids_only: bool = Field(False, description="Send only product IDs; cards come from GET /api/products")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "message": "אני מחפש מזון לכלב",
-                "thread_id": "thread_abc123"
+                "thread_id": "thread_abc123",
+                "compact": True
             }
         }
 
@@ -48,12 +55,43 @@ class Product(BaseModel):
     has_more_variations: bool = False
 
 
+class CompactVariation(BaseModel):
+    """Variation in a compact product card"""
+    id: int
+    name: Optional[str] = None
+    price: Optional[float] = None
+
+
+class CompactProduct(BaseModel):
+    """
+    Compact product card (see utils.products.compact_card)
+
+    Prices are numbers and URLs are relative to ChatResponse.base_url. Empty
+    values are left out, as is everything outside a `fields` projection
+    except the ID.
+    """
+    id: int
+    name: Optional[str] = None
+    price: Optional[float] = None
+    regular_price: Optional[float] = None  # Only for products on sale
+    sale_price: Optional[float] = None
+    image: Optional[str] = None
+    url: Optional[str] = None
+    sku: Optional[str] = None
+    short_description: Optional[str] = None
+    type: Optional[str] = None  # Left out for simple products
+    variations: Optional[List[CompactVariation]] = None
+    has_more_variations: Optional[bool] = None
+
+
 class ChatResponse(BaseModel):
     """Response model for chat endpoint"""
     reply: Optional[str] = None
     thread_id: str
     action: Optional[str] = None
-    products: Optional[List[Product]] = None
+    products: Optional[List[Union[Product, CompactProduct]]] = None
+    base_url: Optional[str] = None  # With compact products
+    product_ids: Optional[List[int]] = None  # Instead of products, when requested with ids_only
 
     class Config:
         json_schema_extra = {
@@ -73,6 +111,17 @@ class ErrorResponse(BaseModel):
     trace: Optional[str] = None
 
 
+class OTPRequest(BaseModel):
+    """Request model for sending a login code"""
+    phone: str = Field(..., min_length=1, max_length=32, description="Customer phone number")
+
+
+class VerifyOrderRequest(BaseModel):
+    """Request model for verifying a login code and listing recent orders"""
+    phone: str = Field(..., min_length=1, max_length=32, description="Customer phone number")
+    code: str = Field(..., min_length=1, max_length=10, description="Code received by SMS")
+
+
 class SyncResponse(BaseModel):
     """Response model for sync endpoint"""
     status: str
@@ -81,14 +130,32 @@ class SyncResponse(BaseModel):
     vector_store_id: Optional[str] = None
     skipped: Optional[bool] = False
     hash: Optional[str] = None
+    job_id: Optional[str] = None
 
     class Config:
         json_schema_extra = {
             "example": {
-                "status": "success",
-                "message": "Catalog synced successfully",
-                "products_count": 150,
-                "vector_store_id": "vs_abc123",
-                "skipped": False
+                "status": "queued",
+                "message": "Sync job started",
+                "job_id": "3f9a1c2b7d4e"
             }
         }
+
+
+class SyncJobStatus(BaseModel):
+    """Progress of a background catalog sync job"""
+    job_id: str
+    status: str
+    pages_done: int
+    total_pages: Optional[int] = None
+    products_done: int
+    total_products: Optional[int] = None
+    shards_done: int
+    shards_reused: int
+    steps: int
+    elapsed_seconds: float
+    products_per_second: float
+    eta_seconds: Optional[float] = None
+    vector_store_id: Optional[str] = None
+    hash: Optional[str] = None
+    error: Optional[str] = None
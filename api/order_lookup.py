@@ -1 +1,107 @@
+"""
+Order Lookup
+Recent orders for a verified phone number, found through the phone -> order
+index (utils.order_index), fetched by ID with only the fields the widget
+shows, and cached briefly in Redis so repeat status checks skip WooCommerce.
+"""
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+from utils.clients import get_async_redis, get_woocommerce_api
+from utils.order_index import find_order_ids
+from utils.phone import normalize_phone_il
+
+logger = logging.getLogger(__name__)
+
+# Everything summarize_order() reads, nothing else
+ORDER_FIELDS = "id,status,total,currency_symbol,date_created,line_items"
+
+MAX_ORDERS = 3
+
+# Order statuses change over hours, not seconds
+ORDER_CACHE_TTL = 120  # seconds
+
+
+def cache_key(phone: str) -> str:
+    return f"orders:recent:{normalize_phone_il(phone)}"
+
+
+def summarize_order(order: dict) -> dict:
+    """The order summary returned to the widget"""
+    return {
+        "id": order['id'],
+        "status": order['status'],
+        "total": f"{order['total']} {order['currency_symbol']}",
+        "date": order['date_created'],
+        "items": [item['name'] for item in order.get('line_items', [])]
+    }
+
+
+def fetch_recent_orders(phone: str, order_ids: Optional[List[int]] = None, wcapi=None) -> List[dict]:
+    """
+    Fetch the phone's latest orders from WooCommerce
+
+    Args:
+        phone: Phone number as the customer entered it
+        order_ids: IDs from the order index; None falls back to WooCommerce's
+            (slow, full-text) order search
+        wcapi: WooCommerce client (defaults to the shared pooled one)
+
+    Returns:
+        Up to MAX_ORDERS order summaries, newest first
+    """
+    if order_ids is not None and not order_ids:
+        return []
+
+    params = {"per_page": MAX_ORDERS, "_fields": ORDER_FIELDS}
+    if order_ids is not None:
+        params["include"] = ",".join(str(i) for i in order_ids[:MAX_ORDERS])
+    else:
+        params["search"] = phone.strip()
+
+    wcapi = wcapi or get_woocommerce_api()
+    res = wcapi.get("orders", params=params)
+    if res.status_code != 200:
+        raise RuntimeError(f"WooCommerce Error {res.status_code}: {res.text[:200]}")
+
+    orders = sorted(res.json(), key=lambda o: o.get('date_created') or '', reverse=True)
+    return [summarize_order(order) for order in orders[:MAX_ORDERS]]
+
+
+async def lookup_orders(phone: str, redis_client=None) -> List[dict]:
+    """
+    Recent order summaries for a phone, served from cache when fresh
+
+    Args:
+        phone: Verified phone number, as the customer entered it
+        redis_client: Asyncio Redis client holding the cache and order index
+            (defaults to the shared one; without Redis WooCommerce is searched)
+
+    The WooCommerce call runs in a worker thread on the pooled session.
+    """
+    redis_client = redis_client or get_async_redis()
+    key = cache_key(phone)
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Order cache read failed: {e}")
+
+    try:
+        order_ids = await find_order_ids(redis_client, phone, MAX_ORDERS)
+    except Exception as e:
+        logger.warning(f"Order index read failed: {e}")
+        order_ids = None
+    orders = await asyncio.to_thread(fetch_recent_orders, phone, order_ids)
+
+    if redis_client is not None:
+        try:
+            await redis_client.setex(key, ORDER_CACHE_TTL, json.dumps(orders, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"Order cache write failed: {e}")
+    return orders
 
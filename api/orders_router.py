@@ -0,0 +1,103 @@
+"""
+Orders Router - Phone -> Order Index Maintenance
+WooCommerce order webhooks and the incremental orders sync that keep
+utils.order_index current for order status lookups.
+"""
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+import os
+import hmac
+import json
+import base64
+import hashlib
+import logging
+from typing import Optional
+
+from utils.clients import get_redis, get_woocommerce_api
+from utils.order_index import index_order, remove_order, sync_order_index
+
+from .order_lookup import cache_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def valid_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """WooCommerce signs webhook bodies with base64(HMAC-SHA256(body, secret))"""
+    if not signature:
+        return False
+    expected = base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(expected, signature)
+
+
+def update_index(redis_client, topic: str, order: dict):
+    """Apply one webhook to the index and drop the affected phones' cached orders"""
+    if topic == "order.deleted":
+        phones = remove_order(redis_client, order["id"])
+    else:
+        phones = index_order(redis_client, order)
+    if phones:
+        redis_client.delete(*[cache_key(phone) for phone in phones])
+    return phones
+
+
+@router.post("/orders/webhook")
+async def order_webhook(
+    request: Request,
+    x_wc_webhook_topic: Optional[str] = Header(None),
+    x_wc_webhook_signature: Optional[str] = Header(None)
+):
+    """
+    Receive WooCommerce order.created / order.updated / order.deleted webhooks
+
+    Configure the webhooks in WooCommerce → Settings → Advanced → Webhooks
+    with this URL and WOO_WEBHOOK_SECRET as the secret.
+    """
+    body = await request.body()
+
+    # WooCommerce pings a new webhook with an unsigned form body
+    if body.startswith(b"webhook_id="):
+        return {"status": "ok"}
+
+    secret = os.getenv("WOO_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=503, detail="Missing WOO_WEBHOOK_SECRET")
+    if not valid_signature(body, x_wc_webhook_signature, secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    if not (x_wc_webhook_topic or "").startswith("order."):
+        return {"status": "ignored"}
+
+    redis_client = get_redis()
+    if redis_client is None:
+        # Acknowledge anyway: WooCommerce disables webhooks that keep failing
+        logger.warning("Redis not available, order webhook not indexed")
+        return {"status": "ignored"}
+
+    try:
+        order = json.loads(body)
+        phones = await run_in_threadpool(update_index, redis_client, x_wc_webhook_topic, order)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid order payload: {e}")
+
+    return {"status": "indexed", "order_id": order["id"], "phones": len(phones)}
+
+
+@router.get("/orders/index/sync")
+async def sync_orders_index(full: bool = False):
+    """
+    Index orders modified since the last sync (cron entry point)
+
+    Query params:
+        full: Re-index every order instead of continuing from the cursor
+    """
+    redis_client = get_redis()
+    if redis_client is None:
+        raise HTTPException(status_code=503, detail="Order index needs REDIS_URL")
+
+    try:
+        return await run_in_threadpool(sync_order_index, redis_client, get_woocommerce_api(), full)
+    except Exception as e:
+        logger.error(f"Order index sync error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,96 @@
+"""
+Products Router - Cacheable Product Cards
+Serves product cards by ID from the card cache, so chat responses can carry
+just product IDs and the browser or Vercel's CDN can serve the cards on repeat
+views. Responses have a strong ETag derived from each product's date_modified
+and are revalidated with If-None-Match; responses with a card whose
+variations could not be loaded are sent no-store.
+"""
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
+import hashlib
+import logging
+
+from utils.products import parse_card_fields
+from utils.serialization import FastJSONResponse, dumps
+
+from .chat_router import CardFormat, fetch_cards, parse_product_ids
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+MAX_PRODUCT_IDS = 50
+
+# Fresh for a minute in the browser and five at the edge, then served stale
+# while one request revalidates in the background
+CACHE_CONTROL = "public, max-age=60, s-maxage=300, stale-while-revalidate=600"
+
+# Cards missing data after a failed lookup must not be pinned at the edge
+PARTIAL_CACHE_CONTROL = "no-store"
+
+
+def cards_etag(cards, card_format: CardFormat) -> str:
+    """
+    Strong ETag for a card list in one format
+
+    Built from the format and each product's ID, date_modified and card
+    variations, so it changes when a product is edited and when its
+    variations change without touching the parent. Cards without a
+    modification date are hashed by content instead.
+    """
+    digest = hashlib.sha256(dumps(card_format.key).encode())
+    for cached in cards:
+        card = cached.card
+        version = cached.date_modified or cached.encoded(("full",), dict).text
+        variations = dumps([card.get('variations') or [], card.get('has_more_variations', False)])
+        digest.update(f"|{card['id']}:{version}:{variations}".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@router.get("/products")
+async def get_products(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated product IDs, in display order"),
+    compact: bool = Query(False, description="Compact cards (see utils.products.compact_card)"),
+    fields: Optional[str] = Query(None, description="Compact card fields to send (implies compact)")
+):
+    """
+    Product cards by ID
+
+    Returns {"products": [...]} in the order of `ids` (unknown IDs are left
+    out), plus "base_url" for compact cards. Answers 304 when If-None-Match
+    has the current ETag.
+    """
+    product_ids = parse_product_ids(ids.split(","))
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="ids required")
+    if len(product_ids) > MAX_PRODUCT_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PRODUCT_IDS} ids")
+
+    projection = parse_card_fields(fields)
+    card_format = CardFormat(compact=compact or bool(projection), fields=projection)
+
+    try:
+        cards = await fetch_cards(product_ids, raise_errors=True)
+    except Exception:
+        # Not cacheable: the edge would keep serving the failure
+        raise HTTPException(status_code=502, detail="Products unavailable", headers={"Cache-Control": "no-store"})
+
+    etag = cards_etag(cards, card_format)
+    partial = any(cached.partial for cached in cards)
+    headers = {"ETag": etag, "Cache-Control": PARTIAL_CACHE_CONTROL if partial else CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FastJSONResponse(content=card_format.payload(cards), headers=headers)
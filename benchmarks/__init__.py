@@ -0,0 +1,4 @@
+"""
+ShopiPet ChatKit Benchmarks
+Offline load tests with local stand-ins for OpenAI and WooCommerce
+"""
@@ -0,0 +1,196 @@
+"""
+CORS Middleware Benchmark
+Compares the previous CORS stack (BaseHTTPMiddleware subclass + Starlette
+CORSMiddleware + catch-all OPTIONS route) with utils.cors.CORSMiddleware by
+calling the ASGI apps in-process, so only middleware overhead is measured.
+
+Usage:
+    python -m benchmarks.bench_cors --requests 2000 --frames 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.chat_streaming import SSE_HEADERS
+from utils.cors import CORSMiddleware
+
+
+class LegacyCORSMiddleware(BaseHTTPMiddleware):
+    """The middleware api/index.py used before the pure ASGI layer"""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method == "OPTIONS":
+            return JSONResponse(
+                content={},
+                headers={
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
+                    "Access-Control-Allow-Headers": "*",
+                    "Access-Control-Max-Age": "3600",
+                }
+            )
+
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+
+def add_routes(app: FastAPI, frames: int, frame_delay: float):
+    """Stand-ins for /api/chat/stream and /api/health with no upstream calls"""
+    frame = 'id: 1\ndata: {"type": "text", "content": "שלום"}\n\n'
+
+    async def events():
+        for _ in range(frames):
+            yield frame
+            if frame_delay:
+                await asyncio.sleep(frame_delay)
+
+    @app.post("/api/chat/stream")
+    async def chat_stream():
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+
+def legacy_app(frames: int, frame_delay: float) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LegacyCORSMiddleware)
+    app.add_middleware(
+        StarletteCORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"]
+    )
+
+    @app.options("/{path:path}")
+    async def options_handler(path: str):
+        return JSONResponse(content={}, headers={"Access-Control-Allow-Origin": "*"})
+
+    add_routes(app, frames, frame_delay)
+    return app
+
+
+def asgi_cors_app(frames: int, frame_delay: float) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware)
+    add_routes(app, frames, frame_delay)
+    return app
+
+
+async def call(app, method: str, path: str, extra_headers=()):
+    """
+    Run one request through the ASGI app
+
+    Returns:
+        (seconds to first body byte, total seconds, body bytes)
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "https",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench.local"),
+            (b"origin", b"https://store.example"),
+            (b"content-type", b"application/json"),
+            *extra_headers,
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench.local", 443),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b'{"message": "hi"}', "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    first_byte = None
+    size = 0
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.body" and message.get("body"):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(message["body"])
+
+    await app(scope, receive, send)
+    total = time.perf_counter() - start
+    disconnected.set()
+    return first_byte if first_byte is not None else total, total, size
+
+
+async def measure(app, method: str, path: str, requests: int, extra_headers=()) -> dict:
+    for _ in range(min(50, requests)):  # Warm up
+        await call(app, method, path, extra_headers)
+
+    ttfb, totals = [], []
+    for _ in range(requests):
+        first, total, _ = await call(app, method, path, extra_headers)
+        ttfb.append(first)
+        totals.append(total)
+
+    totals.sort()
+    return {
+        "mean_us": round(statistics.fmean(totals) * 1e6, 1),
+        "p50_us": round(totals[len(totals) // 2] * 1e6, 1),
+        "p99_us": round(totals[min(len(totals) - 1, int(len(totals) * 0.99))] * 1e6, 1),
+        "ttfb_p50_us": round(sorted(ttfb)[len(ttfb) // 2] * 1e6, 1),
+    }
+
+
+async def run(requests: int, frames: int, frame_delay: float):
+    preflight = ((b"access-control-request-method", b"POST"),
+                 (b"access-control-request-headers", b"content-type"))
+    cases = [
+        ("POST /api/chat/stream", "POST", "/api/chat/stream", ()),
+        ("GET /api/health", "GET", "/api/health", ()),
+        ("OPTIONS preflight", "OPTIONS", "/api/chat/stream", preflight),
+    ]
+    stacks = [("legacy", legacy_app(frames, frame_delay)), ("asgi", asgi_cors_app(frames, frame_delay))]
+
+    print(f"{'case':<24} {'stack':<7} {'mean µs':>10} {'p50 µs':>10} {'p99 µs':>10} {'ttfb p50 µs':>12}")
+    for label, method, path, headers in cases:
+        results = {}
+        for name, app in stacks:
+            results[name] = await measure(app, method, path, requests, headers)
+            r = results[name]
+            print(f"{label:<24} {name:<7} {r['mean_us']:>10} {r['p50_us']:>10} {r['p99_us']:>10} {r['ttfb_p50_us']:>12}")
+        saved = results["legacy"]["mean_us"] - results["asgi"]["mean_us"]
+        print(f"{'':<24} saved {saved:.1f} µs/request ({saved / results['legacy']['mean_us']:.0%})\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CORS middleware overhead")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=50, help="SSE frames per streamed response")
+    parser.add_argument("--frame-delay", type=float, default=0.0, help="Seconds between frames")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.frames, args.frame_delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Catalog Export Benchmark
+Times the sync export (format_product_for_ai, MD5 hash, file write) on
+synthetic catalogs and records peak memory, saving results as JSON.
+
+Usage:
+    python -m benchmarks.bench_sync --sizes 1000,10000,100000
+    python -m benchmarks.bench_sync --sizes 1000 --repeat 5 --output results/
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def export_catalog(products: list, path: str) -> dict:
+    """The same steps sync_catalog runs between fetching products and uploading"""
+    from utils.products import format_product_for_ai
+
+    timings = {}
+
+    start = time.perf_counter()
+    catalog_lines = [format_product_for_ai(product) for product in products]
+    catalog_text = "\n".join(catalog_lines)
+    timings["format"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    catalog_hash = hashlib.md5(catalog_text.encode('utf-8')).hexdigest()
+    timings["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(catalog_text)
+    timings["write"] = time.perf_counter() - start
+
+    timings["total"] = sum(timings.values())
+    return {"timings": timings, "bytes": len(catalog_text.encode('utf-8')), "hash": catalog_hash}
+
+
+def run_size(size: int, repeat: int) -> dict:
+    """Benchmark one catalog size (runs in a fresh process so peak RSS is per size)"""
+    from .catalog import generate_catalog, public_fields
+
+    products = [public_fields(p) for p in generate_catalog(size).values()]
+    rss_after_generate = max_rss_mb()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.txt")
+        for _ in range(repeat):
+            runs.append(export_catalog(products, path))
+        rss_peak = max_rss_mb()
+
+        # Separate pass: tracemalloc slows allocation-heavy code, so it is not timed
+        tracemalloc.start()
+        export_catalog(products, path)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    stages = {}
+    for stage in runs[0]["timings"]:
+        values = [r["timings"][stage] for r in runs]
+        stages[stage] = {
+            "min_ms": round(min(values) * 1000, 2),
+            "median_ms": round(statistics.median(values) * 1000, 2),
+        }
+
+    best_total = min(r["timings"]["total"] for r in runs)
+    return {
+        "products": size,
+        "repeat": repeat,
+        "catalog_bytes": runs[0]["bytes"],
+        "catalog_hash": runs[0]["hash"],
+        "stages": stages,
+        "products_per_second": round(size / best_total) if best_total else None,
+        "rss_after_generate_mb": rss_after_generate,
+        "rss_peak_mb": rss_peak,
+        "export_traced_peak_mb": round(traced_peak / (1024 * 1024), 1),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalog sync export")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma list of catalog sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size")
+    parser.add_argument("--output", default="benchmarks/results", help="Directory for the JSON result file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = []
+
+    ctx = multiprocessing.get_context("spawn")
+    for size in sizes:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_size, (size, args.repeat))
+        results.append(result)
+
+        stages = result["stages"]
+        print(f"{size:>7} products  format {stages['format']['min_ms']:>9.1f} ms  "
+              f"hash {stages['hash']['min_ms']:>7.1f} ms  write {stages['write']['min_ms']:>7.1f} ms  "
+              f"{result['products_per_second']:>7} products/s  "
+              f"{result['catalog_bytes'] / (1024 * 1024):>6.1f} MiB  "
+              f"peak RSS {result['rss_peak_mb']} MiB  traced {result['export_traced_peak_mb']} MiB")
+
+    os.makedirs(args.output, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output, f"sync-{timestamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": "sync_export",
+            "timestamp": timestamp,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nWrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Synthetic WooCommerce Catalog
+Deterministic product and variation JSON shaped like the WooCommerce REST API
+"""
+import random
+from typing import Dict, List
+
+NAMES = ["מזון יבש", "חטיף אילוף", "צעצוע לעיסה", "מיטה אורטופדית", "רצועה מתכווננת", "חול מתגבש"]
+ANIMALS = ["לכלב", "לחתול", "לגור", "לאוגר", "לתוכי"]
+BRANDS = ["רויאל קנין", "הילס", "אקאנה", "פרו פלאן", "טרו"]
+CATEGORIES = ["כלבים", "חתולים", "מכרסמים", "ציפורים", "מזון", "חטיפים", "צעצועים", "טיפוח", "אביזרים"]
+TAGS = ["מומלץ", "חדש", "ללא דגנים", "היפואלרגני", "מבצע"]
+FEATURES = ["מכיל חלבון איכותי", "ללא חומרים משמרים", "מתאים לכל הגילאים", "מחזק את מערכת החיסון",
+            "עשיר באומגה 3", "מיוצר באירופה", "עמיד במיוחד", "קל לניקוי"]
+
+
+def generate_description(rng: random.Random) -> str:
+    """HTML description in the shape WordPress editors produce"""
+    paragraphs = [
+        "<p>" + "&nbsp;".join(["תיאור מפורט של המוצר."] * rng.randint(1, 4)) + "<br>" +
+        ("מתאים לשימוש יומיומי. " * rng.randint(1, 6)).strip() + "</p>"
+        for _ in range(rng.randint(1, 5))
+    ]
+    features = "".join(f"<li><strong>{f}</strong></li>" for f in rng.sample(FEATURES, rng.randint(2, 5)))
+    return "".join(paragraphs) + f"<ul>{features}</ul>"
+
+
+def generate_meta_data(product_id: int, brand: str, rng: random.Random) -> List[dict]:
+    """Plugin meta in the mix seen on real stores, with GTINs under several keys"""
+    gtin_key = rng.choice(["_gtin", "_ean", "_barcode", "_wpm_gtin_code", "hwp_product_gtin"])
+    meta = [
+        {"id": product_id * 10 + 1, "key": gtin_key, "value": f"729{product_id:010d}"},
+        {"id": product_id * 10 + 2, "key": "_yoast_wpseo_focuskw", "value": "מזון לכלבים"},
+        {"id": product_id * 10 + 3, "key": "_wp_page_template", "value": "default"},
+    ]
+    if rng.random() < 0.3:
+        meta.append({"id": product_id * 10 + 4, "key": "_product_brand", "value": brand})
+    return meta
+
+
+def generate_product(product_id: int, rng: random.Random) -> dict:
+    """Build one product; about a third are variable products"""
+    price = rng.randint(20, 400)
+    on_sale = rng.random() < 0.2
+    product_type = "variable" if rng.random() < 0.33 else "simple"
+    brand = rng.choice(BRANDS)
+
+    return {
+        "id": product_id,
+        "name": f"{rng.choice(NAMES)} {rng.choice(ANIMALS)} {rng.choice(BRANDS)}",
+        "type": product_type,
+        "status": "publish",
+        "sku": f"SP-{product_id:06d}",
+        "permalink": f"https://store.example/product/{product_id}/",
+        "date_modified": "2025-01-01T00:00:00",
+        "price": str(price * 0.9 if on_sale else price),
+        "regular_price": str(price),
+        "sale_price": str(price * 0.9) if on_sale else "",
+        "date_on_sale_to": "2025-12-31T23:59:59" if on_sale and rng.random() < 0.5 else None,
+        "on_sale": on_sale,
+        "stock_status": "instock" if rng.random() < 0.9 else "outofstock",
+        "stock_quantity": rng.choice([None, 0, 2, 15, 120]),
+        "total_sales": rng.randint(0, 60),
+        "weight": rng.choice(["", "0.4", "1.5", "12"]),
+        "short_description": "<p>מוצר איכותי לחיית המחמד שלך</p>",
+        "description": generate_description(rng),
+        "images": [{"src": f"https://store.example/img/{product_id}-{i}.jpg"} for i in range(rng.randint(1, 4))],
+        "categories": [{"name": c} for c in rng.sample(CATEGORIES, rng.randint(1, 3))],
+        "tags": [{"name": t} for t in rng.sample(TAGS, rng.randint(0, 2))],
+        "brands": [{"name": brand}] if rng.random() < 0.7 else [],
+        "attributes": [
+            {"name": "משקל", "options": ["1 ק\"ג", "3 ק\"ג", "7 ק\"ג"]},
+            {"name": "טעם", "options": rng.sample(["עוף", "בקר", "סלמון", "כבש"], rng.randint(1, 3))},
+        ],
+        "meta_data": generate_meta_data(product_id, brand, rng),
+    }
+
+
+def generate_variations(product: dict, rng: random.Random) -> List[dict]:
+    """Build 2-8 variations for a variable product"""
+    variations = []
+    for index in range(rng.randint(2, 8)):
+        price = rng.randint(20, 400)
+        variations.append({
+            "id": product["id"] * 100 + index,
+            "name": f"{product['name']} - {index + 1}",
+            "sku": f"{product['sku']}-{index + 1}",
+            "price": str(price),
+            "regular_price": str(price),
+            "sale_price": "",
+            "on_sale": False,
+            "stock_status": "instock" if rng.random() < 0.8 else "outofstock",
+            "purchasable": True,
+            "attributes": [{"name": "משקל", "option": f"{index + 1} ק\"ג"}],
+        })
+    return variations
+
+
+def generate_catalog(size: int, seed: int = 42) -> Dict[int, dict]:
+    """Generate `size` products keyed by ID, each with its variations attached"""
+    rng = random.Random(seed)
+    catalog = {}
+    for product_id in range(1000, 1000 + size):
+        product = generate_product(product_id, rng)
+        product["_variations"] = generate_variations(product, rng) if product["type"] == "variable" else []
+        catalog[product_id] = product
+    return catalog
+
+
+def public_fields(product: dict) -> dict:
+    """Strip private generator fields before returning a product over the API"""
+    return {k: v for k, v in product.items() if not k.startswith("_")}
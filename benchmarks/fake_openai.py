@@ -0,0 +1,283 @@
+"""
+Fake OpenAI Assistants API
+Implements the thread, run, message, assistant and vector-store endpoints the
+app uses, including SSE run streams with a configurable token rate and
+show_products tool calls.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+WORDS = ["היי", "מצאתי", "כמה", "אופציות", "מעולות", "לכלב", "שלך", "🐶", "במחיר", "משתלם", "ממש"]
+CITATION = "【4:0†catalog.txt】"
+
+
+@dataclass
+class ModelProfile:
+    """How the fake assistant behaves"""
+    first_token_delay: float = 0.8   # Seconds before the first token / tool call
+    token_rate: float = 40.0         # Tokens per second while streaming
+    reply_tokens: int = 60           # Tokens per text reply
+    tool_ratio: float = 0.3          # Share of runs that call show_products
+    products_per_call: int = 4
+    product_ids: tuple = tuple(range(1000, 1100))
+
+
+def create_app(profile: ModelProfile = ModelProfile(), seed: int = 7) -> FastAPI:
+    """Build the fake API (mount point: OPENAI_BASE_URL=http://host:port/v1)"""
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    runs = {}
+    messages = {}
+    vector_store_files = {}
+    vector_store_metadata = {}
+    app.state.requests = 0
+
+    def new_id(prefix: str) -> str:
+        return f"{prefix}_{next(ids)}"
+
+    def reply_text() -> str:
+        words = [rng.choice(WORDS) for _ in range(profile.reply_tokens)]
+        return " ".join(words) + CITATION
+
+    def pick_products() -> List[int]:
+        return rng.sample(list(profile.product_ids), profile.products_per_call)
+
+    def run_object(run: dict) -> dict:
+        obj = {
+            "id": run["id"],
+            "object": "thread.run",
+            "created_at": int(run["started"]),
+            "thread_id": run["thread_id"],
+            "assistant_id": run["assistant_id"],
+            "status": run["status"],
+            "required_action": None,
+            "last_error": None,
+            "model": "gpt-4o-mini",
+            "instructions": "",
+            "tools": [],
+            "usage": None,
+        }
+        if run["status"] == "requires_action":
+            obj["required_action"] = {
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {"tool_calls": [{
+                    "id": f"call_{run['id']}",
+                    "type": "function",
+                    "function": {
+                        "name": "show_products",
+                        "arguments": json.dumps({"product_ids": run["product_ids"]})
+                    }
+                }]}
+            }
+        if run["status"] == "completed":
+            obj["usage"] = {"prompt_tokens": 1200, "completion_tokens": profile.reply_tokens,
+                            "total_tokens": 1200 + profile.reply_tokens,
+                            "prompt_tokens_details": {"cached_tokens": 1024}}
+        return obj
+
+    def message_object(message_id: str, thread_id: str, role: str, text: str, status="completed") -> dict:
+        return {
+            "id": message_id,
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "status": status,
+            "assistant_id": None,
+            "run_id": None,
+            "attachments": [],
+            "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}] if text else [],
+        }
+
+    @app.middleware("http")
+    async def count_requests(request, call_next):
+        app.state.requests += 1
+        return await call_next(request)
+
+    @app.post("/v1/threads")
+    async def create_thread():
+        return {"id": new_id("thread"), "object": "thread", "created_at": int(time.time()),
+                "metadata": {}, "tool_resources": None}
+
+    @app.post("/v1/threads/{thread_id}/messages")
+    async def create_message(thread_id: str, request: Request):
+        body = await request.json()
+        return message_object(new_id("msg"), thread_id, "user", str(body.get("content", "")))
+
+    @app.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(thread_id: str):
+        data = [messages.get(thread_id) or message_object(new_id("msg"), thread_id, "assistant", reply_text())]
+        return {"object": "list", "data": data, "first_id": data[0]["id"],
+                "last_id": data[0]["id"], "has_more": False}
+
+    @app.post("/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str, request: Request):
+        body = await request.json()
+        uses_tool = rng.random() < profile.tool_ratio
+        run = {
+            "id": new_id("run"),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "status": "queued",
+            "started": time.time(),
+            "uses_tool": uses_tool,
+            "product_ids": pick_products() if uses_tool else [],
+            "text": reply_text(),
+        }
+        runs[run["id"]] = run
+
+        if body.get("stream"):
+            return StreamingResponse(stream_run(run), media_type="text/event-stream")
+        return run_object(run)
+
+    async def stream_run(run: dict):
+        def sse(event: str, data) -> str:
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        yield sse("thread.run.created", run_object(run))
+        await asyncio.sleep(profile.first_token_delay)
+
+        if run["uses_tool"]:
+            run["status"] = "requires_action"
+            yield sse("thread.run.requires_action", run_object(run))
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+
+        run["status"] = "in_progress"
+        message_id = new_id("msg")
+        yield sse("thread.message.created",
+                  message_object(message_id, run["thread_id"], "assistant", "", status="in_progress"))
+
+        # Split the reply into ~1 token deltas, including a citation split across two of them
+        text = run["text"]
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+        delay = 1.0 / profile.token_rate if profile.token_rate > 0 else 0
+        for chunk in chunks:
+            yield sse("thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text",
+                                       "text": {"value": chunk, "annotations": []}}]}
+            })
+            if delay:
+                await asyncio.sleep(delay)
+
+        message = message_object(message_id, run["thread_id"], "assistant", text)
+        messages[run["thread_id"]] = message
+        yield sse("thread.message.completed", message)
+
+        run["status"] = "completed"
+        yield sse("thread.run.completed", run_object(run))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    @app.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(thread_id: str, run_id: str):
+        run = runs.get(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="No run found")
+
+        if run["status"] in ("queued", "in_progress"):
+            elapsed = time.time() - run["started"]
+            if run["uses_tool"] and elapsed >= profile.first_token_delay:
+                run["status"] = "requires_action"
+            elif not run["uses_tool"]:
+                duration = profile.first_token_delay + profile.reply_tokens / max(profile.token_rate, 1)
+                run["status"] = "completed" if elapsed >= duration else "in_progress"
+                if run["status"] == "completed":
+                    messages[thread_id] = message_object(new_id("msg"), thread_id, "assistant", run["text"])
+
+        return run_object(run)
+
+    @app.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+    async def cancel_run(thread_id: str, run_id: str):
+        run = runs.get(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="No run found")
+        run["status"] = "cancelled"
+        return run_object(run)
+
+    @app.get("/v1/assistants/{assistant_id}")
+    async def retrieve_assistant(assistant_id: str):
+        return {"id": assistant_id, "object": "assistant", "created_at": 0, "model": "gpt-4o-mini",
+                "name": "ShopiBot", "instructions": "", "tools": [{"type": "file_search"}],
+                "tool_resources": {"file_search": {"vector_store_ids": ["vs_bench"]}}, "metadata": {}}
+
+    @app.post("/v1/assistants/{assistant_id}")
+    async def update_assistant(assistant_id: str):
+        return await retrieve_assistant(assistant_id)
+
+    def vector_store_object(vs_id: str) -> dict:
+        return {"id": vs_id, "object": "vector_store", "created_at": int(time.time()),
+                "name": "ShopiPet Store", "status": "completed", "usage_bytes": 0,
+                "metadata": vector_store_metadata.get(vs_id, {}),
+                "file_counts": {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0}}
+
+    @app.post("/v1/vector_stores")
+    async def create_vector_store():
+        return vector_store_object(new_id("vs"))
+
+    @app.get("/v1/vector_stores/{vs_id}")
+    async def retrieve_vector_store(vs_id: str):
+        return vector_store_object(vs_id)
+
+    @app.post("/v1/vector_stores/{vs_id}")
+    async def update_vector_store(vs_id: str, request: Request):
+        body = await request.json()
+        if body.get("metadata") is not None:
+            vector_store_metadata[vs_id] = body["metadata"]
+        return vector_store_object(vs_id)
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        body = await request.body()
+        return {"id": new_id("file"), "object": "file", "bytes": len(body), "created_at": int(time.time()),
+                "filename": "catalog.txt", "purpose": "assistants", "status": "processed"}
+
+    @app.delete("/v1/files/{file_id}")
+    async def delete_file(file_id: str):
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    def vector_store_file(vs_id: str, file_id: str) -> dict:
+        return {"id": file_id, "object": "vector_store.file", "created_at": int(time.time()),
+                "vector_store_id": vs_id, "status": "completed", "usage_bytes": 0, "last_error": None}
+
+    @app.get("/v1/vector_stores/{vs_id}/files")
+    async def list_vector_store_files(vs_id: str, after: Optional[str] = None):
+        file_ids = vector_store_files.get(vs_id, [])
+        if after in file_ids:
+            file_ids = file_ids[file_ids.index(after) + 1:]
+        data = [vector_store_file(vs_id, file_id) for file_id in file_ids]
+        return {"object": "list", "data": data, "first_id": None, "last_id": None, "has_more": False}
+
+    @app.post("/v1/vector_stores/{vs_id}/files")
+    async def attach_vector_store_file(vs_id: str, request: Request):
+        body = await request.json()
+        vector_store_files.setdefault(vs_id, []).append(body["file_id"])
+        return vector_store_file(vs_id, body["file_id"])
+
+    @app.get("/v1/vector_stores/{vs_id}/files/{file_id}")
+    async def retrieve_vector_store_file(vs_id: str, file_id: str):
+        return vector_store_file(vs_id, file_id)
+
+    @app.delete("/v1/vector_stores/{vs_id}/files/{file_id}")
+    async def delete_vector_store_file(vs_id: str, file_id: str):
+        files = vector_store_files.get(vs_id, [])
+        if file_id in files:
+            files.remove(file_id)
+        return {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "runs": len(runs)}
+
+    return app
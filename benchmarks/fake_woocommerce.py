@@ -0,0 +1,65 @@
+"""
+Fake WooCommerce REST API
+Serves a synthetic catalog under /wp-json/wc/v3 with configurable latency
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from .catalog import generate_catalog, public_fields
+
+
+def create_app(catalog_size: int = 500, latency: float = 0.15) -> FastAPI:
+    """
+    Build the fake store
+
+    Args:
+        catalog_size: Number of products in the catalog
+        latency: Seconds added to every request (simulates the PHP backend)
+    """
+    app = FastAPI(title="Fake WooCommerce")
+    catalog = generate_catalog(catalog_size)
+    product_ids = sorted(catalog)
+    app.state.requests = 0
+
+    @app.middleware("http")
+    async def add_latency(request, call_next):
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return await call_next(request)
+
+    @app.get("/wp-json/wc/v3/products")
+    async def list_products(
+        include: Optional[str] = None,
+        per_page: int = Query(10, le=100),
+        page: int = 1,
+        status: Optional[str] = None
+    ):
+        if include:
+            ids = [int(i) for i in include.split(",") if i.strip()]
+            selected = [catalog[i] for i in ids if i in catalog]
+        else:
+            selected = [catalog[i] for i in product_ids]
+
+        start = (page - 1) * per_page
+        total_pages = (len(selected) + per_page - 1) // per_page
+
+        return JSONResponse(
+            [public_fields(p) for p in selected[start:start + per_page]],
+            headers={"X-WP-Total": str(len(selected)), "X-WP-TotalPages": str(total_pages)}
+        )
+
+    @app.get("/wp-json/wc/v3/products/{product_id}/variations")
+    async def list_variations(product_id: int, per_page: int = Query(10, le=100)):
+        product = catalog.get(product_id)
+        if product is None:
+            raise HTTPException(status_code=404, detail="Invalid ID")
+        return product["_variations"][:per_page]
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "products": len(catalog)}
+
+    return app
@@ -0,0 +1,224 @@
+"""
+Load Test Driver
+Runs the real FastAPI app against the fake OpenAI and WooCommerce servers and
+reports throughput, latency percentiles and time to first token.
+
+Usage:
+    python -m benchmarks.load --scenarios chat,stream --concurrency 1,10,50
+    python -m benchmarks.load --scenarios sync --requests 5 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import httpx
+
+from .fake_openai import ModelProfile, create_app as create_openai_app
+from .fake_woocommerce import create_app as create_woocommerce_app
+from .servers import serve
+
+MESSAGES = ["אני מחפש מזון לכלב", "יש לכם צעצועים לחתול?", "מה ההבדל בין רויאל קנין להילס?"]
+
+
+@dataclass
+class Sample:
+    latency: float
+    ttft: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Result:
+    scenario: str
+    concurrency: int
+    requests: int
+    wall_seconds: float
+    samples: List[Sample] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        ok = [s for s in self.samples if s.error is None]
+        latencies = sorted(s.latency for s in ok)
+        ttfts = sorted(s.ttft for s in ok if s.ttft is not None)
+        errors = {}
+        for s in self.samples:
+            if s.error:
+                errors[s.error] = errors.get(s.error, 0) + 1
+
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "ok": len(ok),
+            "errors": errors,
+            "throughput_rps": round(len(ok) / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "latency_ms": percentiles(latencies),
+            "ttft_ms": percentiles(ttfts) if ttfts else None,
+        }
+
+
+def percentiles(values: List[float]) -> dict:
+    """p50/p95/p99/mean in milliseconds (nearest-rank)"""
+    if not values:
+        return {}
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+        return round(values[index] * 1000, 1)
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99),
+            "mean": round(statistics.fmean(values) * 1000, 1)}
+
+
+async def run_chat(client: httpx.AsyncClient, index: int) -> Sample:
+    start = time.perf_counter()
+    response = await client.post("/api/chat", json={"message": MESSAGES[index % len(MESSAGES)]})
+    latency = time.perf_counter() - start
+    if response.status_code != 200:
+        return Sample(latency, error=f"HTTP {response.status_code}")
+    return Sample(latency)
+
+
+async def run_stream(client: httpx.AsyncClient, index: int) -> Sample:
+    start = time.perf_counter()
+    ttft = None
+    error = None
+    payload = {"message": MESSAGES[index % len(MESSAGES)]}
+
+    async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+        if response.status_code != 200:
+            return Sample(time.perf_counter() - start, error=f"HTTP {response.status_code}")
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if ttft is None and event.get("type") in ("text", "products"):
+                ttft = time.perf_counter() - start
+            elif event.get("type") == "error":
+                error = f"stream error: {event.get('message', '')[:80]}"
+
+    return Sample(time.perf_counter() - start, ttft=ttft, error=error)
+
+
+async def run_sync(client: httpx.AsyncClient, index: int) -> Sample:
+    start = time.perf_counter()
+    response = await client.get("/api/sync")
+    latency = time.perf_counter() - start
+    if response.status_code != 200:
+        return Sample(latency, error=f"HTTP {response.status_code}")
+    return Sample(latency)
+
+
+SCENARIOS = {"chat": run_chat, "stream": run_stream, "sync": run_sync}
+
+
+async def run_level(base_url: str, scenario: str, concurrency: int, total: int) -> Result:
+    """Fire `total` requests with at most `concurrency` in flight"""
+    runner = SCENARIOS[scenario]
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(index: int) -> Sample:
+            async with semaphore:
+                try:
+                    return await runner(client, index)
+                except Exception as e:
+                    return Sample(0.0, error=type(e).__name__)
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - start
+
+    return Result(scenario, concurrency, total, wall, list(samples))
+
+
+def configure_environment(openai_url: str, woo_url: str, redis_url: Optional[str]):
+    """Point the app at the fakes; Redis is only used when explicitly given"""
+    os.environ["OPENAI_BASE_URL"] = f"{openai_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["OPENAI_ASSISTANT_ID"] = "asst_bench"
+    os.environ["WOO_BASE_URL"] = woo_url
+    os.environ["WOO_CONSUMER_KEY"] = "ck_bench"
+    os.environ["WOO_CONSUMER_SECRET"] = "cs_bench"
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+    else:
+        os.environ.pop("REDIS_URL", None)
+
+
+def print_table(results: List[dict]):
+    header = f"{'scenario':<8} {'conc':>5} {'ok':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'ttft50':>9} {'ttft95':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        lat = r["latency_ms"] or {}
+        ttft = r["ttft_ms"] or {}
+        print(f"{r['scenario']:<8} {r['concurrency']:>5} {r['ok']:>6} {sum(r['errors'].values()):>5} "
+              f"{r['throughput_rps']:>8} {lat.get('p50', '-'):>9} {lat.get('p95', '-'):>9} "
+              f"{lat.get('p99', '-'):>9} {ttft.get('p50', '-'):>9} {ttft.get('p95', '-'):>9}")
+        for message, count in r["errors"].items():
+            print(f"    {count} x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the ShopiPet ChatKit API")
+    parser.add_argument("--scenarios", default="chat,stream", help="Comma list of: chat, stream, sync")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma list of concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level (default: 5 x concurrency)")
+    parser.add_argument("--catalog-size", type=int, default=500)
+    parser.add_argument("--woo-latency", type=float, default=0.15, help="Seconds per WooCommerce request")
+    parser.add_argument("--first-token-delay", type=float, default=0.8)
+    parser.add_argument("--token-rate", type=float, default=40.0, help="Streamed tokens per second")
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--tool-ratio", type=float, default=0.3, help="Share of runs calling show_products")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis (otherwise the app runs without one)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    profile = ModelProfile(
+        first_token_delay=args.first_token_delay,
+        token_rate=args.token_rate,
+        reply_tokens=args.reply_tokens,
+        tool_ratio=args.tool_ratio,
+        product_ids=tuple(range(1000, 1000 + min(args.catalog_size, 100)))
+    )
+
+    openai_app = create_openai_app(profile)
+    woo_app = create_woocommerce_app(args.catalog_size, args.woo_latency)
+
+    with serve(openai_app) as openai_url, serve(woo_app) as woo_url:
+        configure_environment(openai_url, woo_url, args.redis_url)
+
+        # Imported after the environment is set so module-level config sees the fakes
+        from api.index import app
+
+        with serve(app) as app_url:
+            results = []
+            for scenario in scenarios:
+                for level in levels:
+                    total = args.requests or level * 5
+                    result = asyncio.run(run_level(app_url, scenario, level, total))
+                    results.append(result.summary())
+
+    print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1083,8 +1083,46 @@
         scrollToBottom();
     }
 
+    // כרטיס מקוצר (compact) -> השדות שהכרטיסייה מציגה
+    // מחירים מגיעים כמספרים וכתובות יחסיות ל-base_url
+    function expandCompactCard(p, baseUrl) {
+        const money = v => (v === null || v === undefined) ? '' : `${v} ₪`;
+        const absolute = u => u ? new URL(u, baseUrl || window.location.origin).href : '';
+        return {
+            ...p,
+            type: p.type || 'simple',
+            sku: p.sku || '',
+            short_description: p.short_description || '',
+            on_sale: p.sale_price !== undefined,
+            price: money(p.price),
+            regular_price: money(p.regular_price),
+            sale_price: money(p.sale_price),
+            image: absolute(p.image),
+            permalink: absolute(p.url),
+            variations: (p.variations || []).map(v => ({ ...v, price: money(v.price) })),
+            has_more_variations: !!p.has_more_variations
+        };
+    }
+
+    // טעינת כרטיסיות לפי מזהים - נשמרות במטמון הדפדפן וה-CDN
+    async function loadProducts(ids) {
+        if (!ids.length) return;
+        try {
+            const res = await fetch(`${API_BASE}/products?ids=${ids.join(',')}&compact=1`);
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            const data = await res.json();
+            renderProducts(data.products, data.base_url);
+        } catch (e) {
+            console.error('Failed to load products:', e);
+        }
+    }
+
     // כרטיסיות מוצר - עיצוב אופקי חדש
-    function renderProducts(products) {
+    // baseUrl מגיע רק עם כרטיסים מקוצרים
+    function renderProducts(products, baseUrl) {
+        if (baseUrl !== undefined) {
+            products = products.map(p => expandCompactCard(p, baseUrl));
+        }
         products.forEach(p => {
             const card = document.createElement('div');
             card.className = 'product-card';
@@ -1367,6 +1405,7 @@
 
     // Configuration: Set to true to use streaming, false for polling
     const USE_STREAMING = true;  // Re-enabled - testing streaming with CORS fix
+    const MAX_RESUME_ATTEMPTS = 3;
 
     async function sendMessageStreaming() {
         const text = input.value.trim();
@@ -1379,12 +1418,13 @@
         showWaitingDots();
 
         try {
-            const response = await fetch(`${API_BASE}/chat/stream`, {
+            let response = await fetch(`${API_BASE}/chat/stream`, {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({
                     message: text,
-                    thread_id: localStorage.getItem(STORAGE_KEY)
+                    thread_id: localStorage.getItem(STORAGE_KEY),
+                    ids_only: true
                 })
             });
 
@@ -1396,92 +1436,161 @@
             hideTyping();
 
             // Process the stream
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let buffer = '';
             let currentMessageDiv = null;
             let accumulatedText = '';
 
-            while (true) {
-                const {done, value} = await reader.read();
+            // Resume state: the server buffers the reply when it sends a stream_id
+            let streamId = null;
+            let lastEventId = null;
+            let finished = false;
+            let resumeAttempts = 0;
 
-                if (done) {
-                    break;
-                }
-
-                // Decode the chunk
-                buffer += decoder.decode(value, {stream: true});
-
-                // Process complete lines (SSE format: "data: {...}\n\n")
-                const lines = buffer.split('\n\n');
-                buffer = lines.pop(); // Keep incomplete line in buffer
-
-                for (const line of lines) {
-                    if (!line.trim() || !line.startsWith('data: ')) continue;
-
-                    const jsonStr = line.substring(6); // Remove "data: " prefix
-                    try {
-                        const event = JSON.parse(jsonStr);
+            async function readStream(response) {
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
 
-                        if (event.type === 'thread_id') {
-                            // Store thread ID
-                            localStorage.setItem(STORAGE_KEY, event.thread_id);
+                while (true) {
+                    const {done, value} = await reader.read();
 
-                        } else if (event.type === 'text') {
-                            // Show typing indicator in header if not already shown
-                            if (!currentMessageDiv) {
-                                showTypingStatus();
-
-                                // Create message div for streaming text
-                                const timestamp = Date.now();
-                                const jerusalemTime = getJerusalemTime();
-
-                                // Add date divider if needed
-                                if (shouldShowDateDivider(timestamp)) {
-                                    const dateDivider = document.createElement('div');
-                                    dateDivider.className = 'date-divider';
-                                    dateDivider.innerHTML = `<span class="date-divider-text">${getDateLabel(jerusalemTime)}</span>`;
-                                    messages.appendChild(dateDivider);
-                                }
+                    if (done) {
+                        break;
+                    }
 
-                                currentMessageDiv = document.createElement('div');
-                                currentMessageDiv.className = 'msg bot';
-                                currentMessageDiv.setAttribute('data-timestamp', timestamp);
-                                messages.appendChild(currentMessageDiv);
+                    // Decode the chunk
+                    buffer += decoder.decode(value, {stream: true});
+
+                    // Process complete frames (SSE format: "id: N\ndata: {...}\n\n")
+                    const frames = buffer.split('\n\n');
+                    buffer = frames.pop(); // Keep incomplete frame in buffer
+
+                    for (const frame of frames) {
+                        // Collect data lines and the event ID; skip comments (": ping" heartbeats) and retry
+                        const dataLines = [];
+                        for (const field of frame.split('\n')) {
+                            if (field.startsWith('data: ')) {
+                                dataLines.push(field.substring(6));
+                            } else if (field.startsWith('id: ')) {
+                                lastEventId = field.substring(4);
                             }
+                        }
+                        if (!dataLines.length) continue;
+
+                        const jsonStr = dataLines.join('\n');
+                        try {
+                            const event = JSON.parse(jsonStr);
+
+                            if (event.type === 'stream') {
+                                // Buffered stream ID, used to resume after a dropped connection
+                                streamId = event.stream_id;
+
+                            } else if (event.type === 'thread_id') {
+                                // Store thread ID
+                                localStorage.setItem(STORAGE_KEY, event.thread_id);
+
+                            } else if (event.type === 'queued') {
+                                // A previous message is still being answered - keep waiting
+                                showWaitingDots();
+
+                            } else if (event.type === 'merged') {
+                                // This message was answered together with an earlier one
+                                finished = true;
+                                hideTyping();
+
+                            } else if (event.type === 'text') {
+                                // Show typing indicator in header if not already shown
+                                if (!currentMessageDiv) {
+                                    hideTyping();  // Waiting dots come back while a message is queued
+                                    showTypingStatus();
+
+                                    // Create message div for streaming text
+                                    const timestamp = Date.now();
+                                    const jerusalemTime = getJerusalemTime();
+
+                                    // Add date divider if needed
+                                    if (shouldShowDateDivider(timestamp)) {
+                                        const dateDivider = document.createElement('div');
+                                        dateDivider.className = 'date-divider';
+                                        dateDivider.innerHTML = `<span class="date-divider-text">${getDateLabel(jerusalemTime)}</span>`;
+                                        messages.appendChild(dateDivider);
+                                    }
+
+                                    currentMessageDiv = document.createElement('div');
+                                    currentMessageDiv.className = 'msg bot';
+                                    currentMessageDiv.setAttribute('data-timestamp', timestamp);
+                                    messages.appendChild(currentMessageDiv);
+                                }
 
-                            // Append text delta
-                            accumulatedText += event.content;
-                            const timeStr = formatTime(getJerusalemTime());
-                            currentMessageDiv.innerHTML = accumulatedText + `<div class="msg-timestamp">${timeStr}</div>`;
-                            scrollToBottom();
+                                // Append text delta
+                                accumulatedText += event.content;
+                                const timeStr = formatTime(getJerusalemTime());
+                                currentMessageDiv.innerHTML = accumulatedText + `<div class="msg-timestamp">${timeStr}</div>`;
+                                scrollToBottom();
+
+                            } else if (event.type === 'products') {
+                                // Hide typing and render products
+                                hideTyping();
+                                if (accumulatedText) {
+                                    saveConversation();
+                                }
+                                if (event.product_ids) {
+                                    setTimeout(() => loadProducts(event.product_ids), 300);
+                                } else {
+                                    setTimeout(() => renderProducts(event.data, event.base_url), 300);
+                                }
 
-                        } else if (event.type === 'products') {
-                            // Hide typing and render products
-                            hideTyping();
-                            if (accumulatedText) {
+                            } else if (event.type === 'done') {
+                                // Stream complete
+                                finished = true;
+                                hideTyping();
+                                localStorage.setItem(STORAGE_KEY, event.thread_id);
                                 saveConversation();
+
+                            } else if (event.type === 'busy') {
+                                // OpenAI is at capacity - show the retry message as a bot reply
+                                finished = true;
+                                hideTyping();
+                                addMessage(event.message, 'bot');
+
+                            } else if (event.type === 'error') {
+                                // Error occurred
+                                finished = true;
+                                hideTyping();
+                                addMessage("שגיאה: " + event.message, 'error');
                             }
-                            setTimeout(() => renderProducts(event.data), 300);
-
-                        } else if (event.type === 'done') {
-                            // Stream complete
-                            hideTyping();
-                            localStorage.setItem(STORAGE_KEY, event.thread_id);
-                            saveConversation();
-
-                        } else if (event.type === 'error') {
-                            // Error occurred
-                            hideTyping();
-                            addMessage("שגיאה: " + event.message, 'error');
-                        }
 
-                    } catch (parseError) {
-                        console.error('Failed to parse SSE event:', parseError, jsonStr);
+                        } catch (parseError) {
+                            console.error('Failed to parse SSE event:', parseError, jsonStr);
+                        }
                     }
                 }
             }
 
+            while (true) {
+                let readError = null;
+                try {
+                    await readStream(response);
+                } catch (err) {
+                    readError = err;
+                }
+
+                if (finished || !streamId || resumeAttempts >= MAX_RESUME_ATTEMPTS) {
+                    if (readError) throw readError;
+                    break;
+                }
+
+                // Connection dropped mid-reply - resume from the last event instead of re-sending
+                resumeAttempts++;
+                await new Promise(r => setTimeout(r, 1000 * resumeAttempts));
+                response = await fetch(`${API_BASE}/chat/stream/${streamId}`, {
+                    headers: lastEventId ? {'Last-Event-ID': lastEventId} : {}
+                });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+            }
+
+
             // Final cleanup
             if (accumulatedText && currentMessageDiv) {
                 saveConversation();
@@ -1510,7 +1619,7 @@
         try {
             const res = await fetch(`${API_BASE}/chat`, {
                 method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ message: text, thread_id: localStorage.getItem(STORAGE_KEY) })
+                body: JSON.stringify({ message: text, thread_id: localStorage.getItem(STORAGE_KEY), ids_only: true })
             });
             const data = await res.json();
 
@@ -1522,11 +1631,22 @@
 
             await new Promise(r => setTimeout(r, 300));
 
-            if (data.action === 'show_products' && data.products) {
+            if (data.action === 'show_products' && (data.products || data.product_ids)) {
                 if (data.reply) addMessage(data.reply, 'bot');
-                setTimeout(() => renderProducts(data.products), (data.reply ? data.reply.length * 15 : 0) + 300);
+                const delay = (data.reply ? data.reply.length * 15 : 0) + 300;
+                if (data.product_ids) {
+                    setTimeout(() => loadProducts(data.product_ids), delay);
+                } else {
+                    setTimeout(() => renderProducts(data.products, data.base_url), delay);
+                }
             } else if (data.reply) {
                 addMessage(data.reply, 'bot');
+            } else if (data.action === 'merged') {
+                // Answered together with an earlier message
+                hideTyping();
+            } else if (data.detail) {
+                hideTyping();
+                addMessage(data.detail, 'error');
             } else if (data.error) {
                 hideTyping();
                 addMessage("שגיאה: " + data.error, 'error');
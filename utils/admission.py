@@ -0,0 +1,275 @@
+"""
+OpenAI Admission Control
+Keeps request and token rates under the account's OpenAI limits, shared
+across instances through Redis, and sheds new conversations first.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Account limits for the assistant's model (override per deployment)
+DEFAULT_RPM_LIMIT = 500
+DEFAULT_TPM_LIMIT = 200000
+
+# Prompt + completion tokens reserved per run until the real usage is known.
+# Assistant runs carry instructions and file_search results, so this is high.
+DEFAULT_RUN_TOKENS = 6000
+
+# New conversations may only use this share of the limits; the rest is kept
+# for conversations already in progress
+NEW_CONVERSATION_SHARE = 0.85
+
+# How long a request may wait for capacity before it is shed
+MAX_WAIT = {"existing": 8.0, "new": 3.0}
+
+# OpenAI calls every turn makes, reserved up front: messages.create and
+# runs.create (or runs.stream), plus threads.create for a new conversation.
+# Polls, message listing and cancels are added as they happen.
+TURN_REQUESTS = {"existing": 2, "new": 3}
+
+POLL_INTERVAL = 0.25  # seconds
+
+# Retry-After sent with a shed request (the sliding window frees up gradually)
+SHED_RETRY_AFTER = 5.0
+
+# Back-off applied to every instance after an upstream 429
+DEFAULT_COOLDOWN_MS = 2000
+
+BUSY_MESSAGE = "יש כרגע עומס גדול במיוחד 🐾 נסו לשלוח שוב בעוד כמה שניות"
+
+# Sliding one-minute window approximated from this and last minute's counters.
+# KEYS: rpm now, rpm previous, tpm now, tpm previous, cooldown
+# ARGV: rpm limit, tpm limit, tokens to reserve, weight of previous minute, key TTL,
+#       requests to reserve
+ADMIT_SCRIPT = """
+local cooldown = redis.call('pttl', KEYS[5])
+if cooldown > 0 then
+    return {0, cooldown}
+end
+local weight = tonumber(ARGV[4])
+local requests = tonumber(redis.call('get', KEYS[1]) or '0') + tonumber(redis.call('get', KEYS[2]) or '0') * weight
+local tokens = tonumber(redis.call('get', KEYS[3]) or '0') + tonumber(redis.call('get', KEYS[4]) or '0') * weight
+if requests + tonumber(ARGV[6]) > tonumber(ARGV[1]) or tokens + tonumber(ARGV[3]) > tonumber(ARGV[2]) then
+    return {0, 0}
+end
+redis.call('incrby', KEYS[1], ARGV[6])
+redis.call('expire', KEYS[1], ARGV[5])
+redis.call('incrby', KEYS[3], ARGV[3])
+redis.call('expire', KEYS[3], ARGV[5])
+return {1, 0}
+"""
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class Admission:
+    """Outcome of admit(); pass it to record_usage() when the run finishes"""
+    admitted: bool
+    reserved_tokens: int = 0
+    minute: int = 0
+    waited: float = 0.0
+    retry_after: float = 0.0  # Seconds the client should wait when shed
+
+
+class AdmissionController:
+    """
+    Request/token rate admission in front of OpenAI runs
+
+    Each turn reserves its fixed OpenAI calls (TURN_REQUESTS) and an
+    estimated token count in the current minute's counters; further calls
+    (polls, message listing, cancels) are added with record_requests(), and
+    once the run reports its real
+    usage the token difference is settled. Conversations already in progress may use the
+    full limits, new ones only NEW_CONVERSATION_SHARE of them. A request
+    that finds no capacity waits briefly and is then shed, so callers can
+    answer with BUSY_MESSAGE instead of an upstream 429. With Redis the
+    counters (`admission:{rpm|tpm}:{minute}`) and the post-429 cooldown
+    (`admission:cooldown`) are shared by all instances.
+    """
+
+    def __init__(
+        self,
+        rpm_limit: int = DEFAULT_RPM_LIMIT,
+        tpm_limit: int = DEFAULT_TPM_LIMIT,
+        run_tokens: int = DEFAULT_RUN_TOKENS,
+        redis_getter: Optional[Callable[[], Any]] = None
+    ):
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.run_tokens = run_tokens
+        self.redis_getter = redis_getter
+        self._counters: Dict[str, int] = {}
+        self._cooldown_until = 0.0
+
+    @classmethod
+    def from_env(cls, redis_getter: Optional[Callable[[], Any]] = None) -> "AdmissionController":
+        """Limits from OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT and OPENAI_RUN_TOKENS"""
+        return cls(
+            rpm_limit=_int_env("OPENAI_RPM_LIMIT", DEFAULT_RPM_LIMIT),
+            tpm_limit=_int_env("OPENAI_TPM_LIMIT", DEFAULT_TPM_LIMIT),
+            run_tokens=_int_env("OPENAI_RUN_TOKENS", DEFAULT_RUN_TOKENS),
+            redis_getter=redis_getter
+        )
+
+    def estimate_tokens(self, message: str) -> int:
+        # Hebrew averages roughly two characters per token
+        return self.run_tokens + len(message) // 2
+
+    async def admit(self, message: str, existing_conversation: bool) -> Admission:
+        """
+        Wait for capacity for one turn
+
+        Args:
+            message: The user message (adds to the token estimate)
+            existing_conversation: True for a known thread (higher priority)
+
+        Returns:
+            Admission with admitted=False when the request should be shed
+        """
+        priority = "existing" if existing_conversation else "new"
+        share = 1.0 if existing_conversation else NEW_CONVERSATION_SHARE
+        tokens = self.estimate_tokens(message)
+        start = time.monotonic()
+        deadline = start + MAX_WAIT[priority]
+
+        while True:
+            minute, weight = self._window()
+            ok, cooldown_ms = await self._try_reserve(
+                int(self.rpm_limit * share), int(self.tpm_limit * share),
+                TURN_REQUESTS[priority], tokens, minute, weight
+            )
+            if ok:
+                return Admission(True, tokens, minute, waited=time.monotonic() - start)
+
+            now = time.monotonic()
+            if now >= deadline:
+                logger.warning(f"Shedding {priority} conversation after {now - start:.1f}s: OpenAI quota exhausted")
+                retry_after = cooldown_ms / 1000 if cooldown_ms else SHED_RETRY_AFTER
+                return Admission(False, waited=now - start, retry_after=round(retry_after, 1))
+
+            await asyncio.sleep(min(POLL_INTERVAL, deadline - now))
+
+    async def record_usage(self, admission: Admission, total_tokens: Optional[int]):
+        """Settle the token reservation with the run's real usage"""
+        if not admission.admitted or total_tokens is None:
+            return
+        delta = int(total_tokens) - admission.reserved_tokens
+        if delta == 0:
+            return
+
+        key = f"admission:tpm:{admission.minute}"
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                pipe.incrby(key, delta)
+                pipe.expire(key, 120)
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Admission usage update failed: {e}")
+        self._counters[key] = self._counters.get(key, 0) + delta
+
+    async def record_requests(self, count: int = 1):
+        """
+        Count OpenAI calls made outside admit() (run polls, cancels) against
+        the current minute's request window
+        """
+        key = f"admission:rpm:{self._window()[0]}"
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                pipe.incrby(key, count)
+                pipe.expire(key, 120)
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Admission request count update failed: {e}")
+        self._counters[key] = self._counters.get(key, 0) + count
+
+    async def rate_limited(self, retry_after: Optional[float] = None):
+        """Called after an upstream 429: pause admissions on every instance"""
+        cooldown_ms = int((retry_after or 0) * 1000) or DEFAULT_COOLDOWN_MS
+        self._cooldown_until = time.monotonic() + cooldown_ms / 1000
+
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                await redis_client.set("admission:cooldown", "1", px=cooldown_ms)
+            except Exception as e:
+                logger.warning(f"Failed to share OpenAI cooldown: {e}")
+
+    def _redis(self):
+        return self.redis_getter() if self.redis_getter else None
+
+    @staticmethod
+    def _window():
+        now = time.time()
+        minute = int(now // 60)
+        # Weight of the previous minute in a sliding 60 s window
+        return minute, 1 - (now % 60) / 60
+
+    async def _try_reserve(
+        self, rpm_limit: int, tpm_limit: int, requests: int, tokens: int, minute: int, weight: float
+    ):
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                admitted, cooldown_ms = await redis_client.eval(
+                    ADMIT_SCRIPT, 5,
+                    f"admission:rpm:{minute}", f"admission:rpm:{minute - 1}",
+                    f"admission:tpm:{minute}", f"admission:tpm:{minute - 1}",
+                    "admission:cooldown",
+                    rpm_limit, tpm_limit, tokens, f"{weight:.4f}", 120, requests
+                )
+                return bool(admitted), int(cooldown_ms)
+            except Exception as e:
+                logger.warning(f"Admission Redis error ({e}), using in-process counters")
+
+        cooldown = self._cooldown_until - time.monotonic()
+        if cooldown > 0:
+            return False, int(cooldown * 1000)
+
+        counters = self._counters
+        for key in [k for k in counters if int(k.rsplit(":", 1)[1]) < minute - 1]:
+            del counters[key]
+
+        made = counters.get(f"admission:rpm:{minute}", 0) + counters.get(f"admission:rpm:{minute - 1}", 0) * weight
+        used = counters.get(f"admission:tpm:{minute}", 0) + counters.get(f"admission:tpm:{minute - 1}", 0) * weight
+        if made + requests > rpm_limit or used + tokens > tpm_limit:
+            return False, 0
+
+        counters[f"admission:rpm:{minute}"] = counters.get(f"admission:rpm:{minute}", 0) + requests
+        counters[f"admission:tpm:{minute}"] = counters.get(f"admission:tpm:{minute}", 0) + tokens
+        return True, 0
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for openai.RateLimitError (checked by status so openai needn't be imported)"""
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (or OpenAI's retry-after-ms) from a 429 response"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
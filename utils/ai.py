@@ -1,15 +1,14 @@
-import os
-import numpy as np
-from openai import OpenAI
 import json
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# The process-wide client, created on first use so importing this module doesn't load openai
+from .clients import get_openai_client
 
 def get_embedding(text):
     text = text.replace("\n", " ")
-    return client.embeddings.create(input=[text], model="text-embedding-3-small").data[0].embedding
+    return get_openai_client().embeddings.create(input=[text], model="text-embedding-3-small").data[0].embedding
 
 def cosine_similarity(a, b):
+    import numpy as np
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 # --- פונקציה חדשה: המוח שמבין מה הלקוח רוצה ---
@@ -20,7 +19,7 @@ def classify_intent(message):
     - order: הלקוח שואל על סטטוס הזמנה/משלוח.
     - chat: הלקוח סתם מברך לשלום, מודה, או מדבר שיחת חולין (Small talk).
     """
-    response = client.chat.completions.create(
+    response = get_openai_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "You are a classifier. Classify the user message into one of these JSON values: {'intent': 'search'} (for product questions), {'intent': 'order'} (for shipping/order status), or {'intent': 'chat'} (for greetings, thanks, or general talk). Return ONLY JSON."},
@@ -57,7 +56,7 @@ def get_chat_response(messages, context_text):
     
     full_messages = [{"role": "system", "content": system_prompt}] + messages
     
-    response = client.chat.completions.create(
+    response = get_openai_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=full_messages,
         temperature=0.7
@@ -0,0 +1,106 @@
+"""
+Micro-batching Loader
+Collects keys requested by concurrent callers over a few milliseconds and
+loads their union with one upstream call, then hands each caller its share.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = 0.005  # seconds
+MAX_BATCH_SIZE = 100  # WooCommerce per_page ceiling
+
+
+class BatchLoader:
+    """
+    Batch concurrent key lookups into bulk calls
+
+    `load_fn` receives a list of unique keys (at most `max_batch_size`) and
+    returns a dict mapping each found key to its value. Keys it does not
+    return resolve to None for their callers. A failed bulk call fails every
+    caller that was waiting on it.
+    """
+
+    def __init__(
+        self,
+        load_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        window: float = BATCH_WINDOW,
+        max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.load_fn = load_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self._pending: Dict[Hashable, List[asyncio.Future]] = {}
+        self._timer = None
+        self._tasks = set()
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Load several keys, sharing the upstream call with concurrent callers
+
+        Returns:
+            Dict of key -> value for the keys that were found
+        """
+        loop = asyncio.get_running_loop()
+        futures = {}
+
+        for key in keys:
+            if key in futures:
+                continue
+            future = loop.create_future()
+            self._pending.setdefault(key, []).append(future)
+            futures[key] = future
+
+        if not futures:
+            return {}
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+
+        values = await asyncio.gather(*futures.values(), return_exceptions=True)
+        for value in values:
+            if isinstance(value, BaseException):
+                raise value
+
+        return {
+            key: value
+            for key, value in zip(futures, values)
+            if value is not None
+        }
+
+    def _dispatch(self):
+        """Send everything collected so far, split into batches of max_batch_size"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, List[asyncio.Future]]):
+        try:
+            results = await self.load_fn(list(batch))
+        except Exception as e:
+            logger.error(f"Batch load of {len(batch)} keys failed: {e}")
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in batch.items():
+            value = results.get(key)
+            for future in futures:
+                if not future.done():
+                    future.set_result(value)
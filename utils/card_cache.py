@@ -0,0 +1,82 @@
+"""
+Product Card Cache
+Product cards built for the widget, kept in process for a short time with
+their JSON encodings memoized per card format, so repeat product displays
+skip both the WooCommerce fetch and re-serializing the cards.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from .serialization import RawJSON, dumps
+
+CARD_CACHE_TTL = 60  # seconds; prices and stock must not lag for long
+CARD_CACHE_SIZE = 2000  # cards per instance
+
+
+class CachedCard:
+    """One built card plus its serialized forms"""
+    __slots__ = ("card", "date_modified", "expires", "partial", "_encoded")
+
+    def __init__(self, card: dict, date_modified: Optional[str], expires: float, partial: bool = False):
+        self.card = card
+        self.date_modified = date_modified  # WooCommerce date_modified_gmt
+        self.expires = expires
+        self.partial = partial  # Built despite a failed lookup; never cached
+        self._encoded: Dict[Hashable, RawJSON] = {}
+
+    def encoded(self, key: Hashable, render: Callable[[dict], dict]) -> RawJSON:
+        """
+        The card rendered by `render` as JSON, serialized on first use
+
+        Args:
+            key: Identifies the rendering (e.g. card format and fields)
+            render: Builds the payload from the card; called once per key
+        """
+        raw = self._encoded.get(key)
+        if raw is None:
+            raw = self._encoded[key] = RawJSON(dumps(render(self.card)))
+        return raw
+
+
+class CardCache:
+    """
+    TTL cache of CachedCard by product ID, evicting the oldest cards first
+
+    Per-instance only: a card may be up to `ttl` seconds behind WooCommerce.
+    """
+
+    def __init__(self, ttl: float = CARD_CACHE_TTL, max_size: int = CARD_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cards: "OrderedDict[int, CachedCard]" = OrderedDict()
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, CachedCard]:
+        """Fresh cached cards for the IDs that have one"""
+        now = time.monotonic()
+        found = {}
+        for product_id in product_ids:
+            cached = self._cards.get(product_id)
+            if cached is None:
+                continue
+            if cached.expires <= now:
+                del self._cards[product_id]
+                continue
+            found[product_id] = cached
+        return found
+
+    def put(self, card: dict, date_modified: Optional[str] = None, partial: bool = False) -> CachedCard:
+        """
+        Cache a freshly built card, replacing any previous one
+
+        Partial cards (e.g. variations could not be loaded) are returned
+        without being cached, so the next request builds them again.
+        """
+        if partial:
+            return CachedCard(card, date_modified, time.monotonic(), partial=True)
+        cached = CachedCard(card, date_modified, time.monotonic() + self.ttl)
+        self._cards.pop(card["id"], None)
+        self._cards[card["id"]] = cached
+        while len(self._cards) > self.max_size:
+            self._cards.popitem(last=False)
+        return cached
@@ -0,0 +1,95 @@
+"""
+Citation Marker Stripping
+Removes file_search annotations such as 【4:0†source】 from assistant text
+"""
+import re
+
+
+CITATION_OPEN = "【"
+CITATION_CLOSE = "】"
+
+# Longest marker we are willing to hold back while waiting for the closing bracket.
+# Real markers look like 【4:0†catalog.txt】; anything longer is treated as plain text.
+MAX_MARKER_LENGTH = 64
+
+CITATION_PATTERN = re.compile(r'【.*?】')
+
+
+def strip_citations(text: str) -> str:
+    """Remove citation markers from a complete text"""
+    if CITATION_OPEN not in text:
+        return text
+    return CITATION_PATTERN.sub('', text)
+
+
+class CitationFilter:
+    """
+    Incremental citation stripper for streamed text
+
+    Matches the behaviour of `strip_citations` on the concatenated stream no
+    matter how markers are split across deltas. Only the text of a marker
+    that is still open is held back; everything else is returned right away.
+    Each character is scanned once, so the cost is linear in the stream size.
+    """
+
+    def __init__(self, max_marker_length: int = MAX_MARKER_LENGTH):
+        self.max_marker_length = max_marker_length
+        self._pending = ""  # Open marker text, starting with CITATION_OPEN
+
+    def feed(self, text: str) -> str:
+        """
+        Filter the next delta
+
+        Args:
+            text: Raw text delta from the model
+
+        Returns:
+            Text that is safe to send now (may be empty)
+        """
+        out = []
+        pos = 0
+        length = len(text)
+
+        while pos < length:
+            if not self._pending:
+                start = text.find(CITATION_OPEN, pos)
+                if start == -1:
+                    out.append(text[pos:])
+                    break
+
+                out.append(text[pos:start])
+                self._pending = CITATION_OPEN
+                pos = start + 1
+                continue
+
+            # Inside a marker: look for its end
+            close = text.find(CITATION_CLOSE, pos)
+            newline = text.find("\n", pos, close if close != -1 else length)
+
+            if newline != -1:
+                # Markers never span lines - what we held back was plain text
+                out.append(self._pending + text[pos:newline])
+                self._pending = ""
+                pos = newline
+                continue
+
+            if close != -1:
+                # Marker complete - drop it
+                self._pending = ""
+                pos = close + 1
+                continue
+
+            self._pending += text[pos:]
+            if len(self._pending) > self.max_marker_length:
+                # Too long to be a marker: release the bracket and re-scan the rest
+                held, self._pending = self._pending, ""
+                out.append(CITATION_OPEN)
+                out.append(self.feed(held[1:]))
+            break
+
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Return any held-back text at the end of the stream (an unclosed marker)"""
+        held, self._pending = self._pending, ""
+        return held
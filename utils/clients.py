@@ -0,0 +1,371 @@
+"""
+Shared Clients
+Lazily created, process-wide clients reused across warm invocations
+"""
+import asyncio
+import inspect
+import os
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between Redis liveness checks on idle pooled connections
+HEALTH_CHECK_INTERVAL = 30
+
+# Upper bound on pooled HTTP connections per upstream
+POOL_SIZE = 20
+
+OPENAI_TIMEOUT = 60.0
+OPENAI_MAX_RETRIES = 2
+WOO_TIMEOUT = 20
+
+
+class ClientConfigError(RuntimeError):
+    """Raised when the environment is missing settings a client needs"""
+
+
+# name -> (config key, client). Async clients include their event loop in the
+# key, since their connection pools cannot be shared across loops.
+_clients: Dict[str, Tuple[tuple, object]] = {}
+_lock = threading.Lock()
+
+
+def _cached(name: str, config_key: tuple, factory: Callable[[], object]):
+    """Return the registered client for `name`, rebuilding it if its config changed"""
+    entry = _clients.get(name)
+    if entry is not None and entry[0] == config_key:
+        return entry[1]
+
+    with _lock:
+        entry = _clients.get(name)
+        if entry is not None and entry[0] == config_key:
+            return entry[1]
+
+        client = factory()
+        _clients[name] = (config_key, client)
+
+    if entry is not None:
+        logger.info(f"Rebuilt {name} client after configuration change")
+        _close_quietly(entry[1])
+    return client
+
+
+def _close_quietly(client):
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    try:
+        result = close()
+    except Exception as e:
+        logger.debug(f"Ignoring error while closing client: {e}")
+        return
+
+    if inspect.isawaitable(result):
+        # Async clients close on their own loop; if none is running, let GC clean up
+        if _current_loop() is None:
+            result.close()
+        else:
+            asyncio.ensure_future(_await_quietly(result))
+
+
+async def _await_quietly(awaitable):
+    try:
+        await awaitable
+    except Exception as e:
+        logger.debug(f"Ignoring error while closing client: {e}")
+
+
+def reset_client(name: str):
+    """Drop a client so the next call reconnects from scratch"""
+    with _lock:
+        entry = _clients.pop(name, None)
+    if entry is not None:
+        logger.warning(f"Resetting {name} client")
+        _close_quietly(entry[1])
+
+
+def _current_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+def _openai_config() -> tuple:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ClientConfigError("Missing OPENAI_API_KEY")
+    return (api_key, os.getenv("OPENAI_BASE_URL"))
+
+
+def get_openai_client():
+    """Get the shared synchronous OpenAI client (one pooled HTTP session per process)"""
+    config = _openai_config()
+
+    def build():
+        from openai import OpenAI
+        return OpenAI(api_key=config[0], timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
+    return _cached("openai", config, build)
+
+
+def get_async_openai_client():
+    """Get the shared AsyncOpenAI client for the running event loop"""
+    config = _openai_config()
+
+    def build():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=config[0], timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
+    return _cached("async_openai", config + (_current_loop(),), build)
+
+
+# ---------------------------------------------------------------------------
+# WooCommerce
+# ---------------------------------------------------------------------------
+
+class WooCommerceClient:
+    """
+    WooCommerce REST client on a pooled requests.Session
+
+    Drop-in for the get/post/put/delete calls of woocommerce.API, but keeps
+    TCP/TLS connections alive between requests. HTTPS stores authenticate
+    with basic auth; plain HTTP stores get OAuth 1.0a signed URLs, as
+    woocommerce.API does.
+    """
+
+    def __init__(self, url: str, consumer_key: str, consumer_secret: str,
+                 version: str = "wc/v3", timeout: float = WOO_TIMEOUT, pool_size: int = POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.url = url.rstrip("/")
+        self.version = version
+        self.timeout = timeout
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.is_ssl = url.startswith("https")
+
+        # Connection errors and gateway hiccups on idempotent calls are retried
+        # on a fresh connection; everything else is returned to the caller
+        retry = Retry(
+            total=2,
+            connect=2,
+            read=0,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "user-agent": "ShopiPet-ChatKit",
+            "accept": "application/json",
+        })
+        if self.is_ssl:
+            self.session.auth = (consumer_key, consumer_secret)
+
+    def request(self, method: str, endpoint: str, data=None, params: Optional[dict] = None, **kwargs):
+        url = f"{self.url}/wp-json/{self.version}/{endpoint}"
+        params = dict(params or {})
+
+        if not self.is_ssl:
+            from urllib.parse import urlencode
+            from woocommerce.oauth import OAuth
+
+            url = OAuth(
+                url=f"{url}?{urlencode(params)}" if params else url,
+                consumer_key=self.consumer_key,
+                consumer_secret=self.consumer_secret,
+                version=self.version,
+                method=method,
+            ).get_oauth_url()
+            params = None
+
+        return self.session.request(
+            method,
+            url,
+            params=params,
+            json=data,
+            timeout=kwargs.pop("timeout", self.timeout),
+            **kwargs
+        )
+
+    def get(self, endpoint: str, **kwargs):
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, data, **kwargs):
+        return self.request("POST", endpoint, data=data, **kwargs)
+
+    def put(self, endpoint: str, data, **kwargs):
+        return self.request("PUT", endpoint, data=data, **kwargs)
+
+    def delete(self, endpoint: str, **kwargs):
+        return self.request("DELETE", endpoint, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def get_woocommerce_api() -> WooCommerceClient:
+    """Get the shared WooCommerce client"""
+    required_vars = ["WOO_BASE_URL", "WOO_CONSUMER_KEY", "WOO_CONSUMER_SECRET"]
+    missing = [var for var in required_vars if not os.getenv(var)]
+    if missing:
+        raise ClientConfigError(f"Missing WooCommerce config: {', '.join(missing)}")
+
+    config = tuple(os.getenv(var) for var in required_vars)
+    return _cached("woocommerce", config, lambda: WooCommerceClient(*config))
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+def _redis_options(use_asyncio: bool = False) -> dict:
+    from redis.backoff import ExponentialBackoff
+    if use_asyncio:
+        from redis.asyncio.retry import Retry
+    else:
+        from redis.retry import Retry
+
+    return {
+        "decode_responses": True,
+        "health_check_interval": HEALTH_CHECK_INTERVAL,
+        "socket_keepalive": True,
+        "retry": Retry(ExponentialBackoff(cap=1.0, base=0.05), 2),
+        "retry_on_timeout": True,
+    }
+
+
+def _redis_url() -> Optional[str]:
+    # The standalone auth handlers used the Vercel integration's prefixed name
+    return os.getenv("REDIS_URL") or os.getenv("shopipetbot_REDIS_URL")
+
+
+_last_ping = 0.0
+
+
+def get_redis():
+    """
+    Get the shared synchronous Redis client
+    Returns None if Redis is not configured or unreachable (graceful degradation)
+    """
+    global _last_ping
+
+    redis_url = _redis_url()
+    if not redis_url:
+        return None
+
+    try:
+        import redis
+        client = _cached("redis", (redis_url,), lambda: redis.from_url(redis_url, **_redis_options()))
+    except ImportError:
+        logger.warning("redis package not installed")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to create Redis client: {e}")
+        return None
+
+    # Verify the pool at most every HEALTH_CHECK_INTERVAL seconds; reconnect once on failure
+    now = time.monotonic()
+    if now - _last_ping < HEALTH_CHECK_INTERVAL:
+        return client
+
+    try:
+        client.ping()
+    except Exception as e:
+        logger.warning(f"Redis health check failed ({e}), reconnecting")
+        reset_client("redis")
+        try:
+            client = _cached("redis", (redis_url,), lambda: redis.from_url(redis_url, **_redis_options()))
+            client.ping()
+        except Exception as retry_error:
+            logger.error(f"Redis unavailable: {retry_error}")
+            return None
+
+    _last_ping = now
+    return client
+
+
+def get_async_redis():
+    """
+    Get the shared asyncio Redis client for the running event loop
+    Returns None if Redis is not configured (graceful degradation)
+
+    Stale connections are detected by redis-py's health_check_interval and
+    re-established on the next command.
+    """
+    redis_url = _redis_url()
+    if not redis_url:
+        return None
+
+    try:
+        import redis.asyncio as aioredis
+        return _cached(
+            "async_redis",
+            (redis_url, _current_loop()),
+            lambda: aioredis.from_url(redis_url, **_redis_options(use_asyncio=True))
+        )
+    except ImportError:
+        logger.warning("redis package not installed")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to create async Redis client: {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# SMS
+# ---------------------------------------------------------------------------
+
+def get_sms_client():
+    """Get the shared Flashy SMS client for the running event loop"""
+    api_key = os.getenv("FLASHY_API_KEY")
+    sender_id = os.getenv("FLASHY_SENDER_ID")
+    if not api_key or not sender_id:
+        raise ClientConfigError("Missing FLASHY_API_KEY or FLASHY_SENDER_ID")
+
+    from .sms import FlashySMSClient
+    return _cached("sms", (api_key, sender_id, _current_loop()), lambda: FlashySMSClient(api_key, sender_id))
+
+
+# ---------------------------------------------------------------------------
+# Health
+# ---------------------------------------------------------------------------
+
+async def check_clients() -> dict:
+    """
+    Report which clients are warm and whether Redis answers
+
+    Returns:
+        {"warm": [client names], "redis": "ok" | "unavailable" | "not_configured"}
+    """
+    status = {}
+
+    redis_client = get_async_redis()
+    if redis_client is None:
+        status["redis"] = "not_configured"
+    else:
+        try:
+            await asyncio.wait_for(redis_client.ping(), timeout=2)
+            status["redis"] = "ok"
+        except Exception as e:
+            logger.warning(f"Redis health check failed ({e}), reconnecting")
+            reset_client("async_redis")
+            status["redis"] = "unavailable"
+
+    status["warm"] = sorted(_clients)
+    return status
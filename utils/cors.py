@@ -1,6 +1,60 @@
-def cors_headers():
-    return {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type"
-    }
+"""
+CORS
+Pure ASGI CORS layer for the FastAPI app.
+"""
+ALLOW_ORIGIN = "*"
+ALLOW_METHODS = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
+ALLOW_HEADERS = "*"
+EXPOSE_HEADERS = "*"
+MAX_AGE = "86400"
+
+
+# Encoded once at import; appended as-is to every response
+RESPONSE_HEADERS = [
+    (b"access-control-allow-origin", ALLOW_ORIGIN.encode()),
+    (b"access-control-allow-methods", ALLOW_METHODS.encode()),
+    (b"access-control-allow-headers", ALLOW_HEADERS.encode()),
+    (b"access-control-expose-headers", EXPOSE_HEADERS.encode()),
+    (b"timing-allow-origin", ALLOW_ORIGIN.encode()),  # Lets the widget read Server-Timing
+]
+
+PREFLIGHT_START = {
+    "type": "http.response.start",
+    "status": 204,
+    "headers": RESPONSE_HEADERS + [
+        (b"access-control-max-age", MAX_AGE.encode()),
+        (b"content-length", b"0"),
+    ],
+}
+PREFLIGHT_BODY = {"type": "http.response.body", "body": b""}
+
+
+class CORSMiddleware:
+    """
+    Allow-all CORS as a plain ASGI middleware
+
+    OPTIONS requests are answered before routing. Other responses get the
+    precomputed headers added to their http.response.start message while
+    body messages pass straight through, so streaming responses are neither
+    buffered nor copied.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            await send(PREFLIGHT_START)
+            await send(PREFLIGHT_BODY)
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + RESPONSE_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
@@ -1,16 +1,18 @@
-import os
-import redis
 import json
 
-# שימוש במשתנה הקיים אצלך
-redis_url = os.environ.get("shopipetbot_REDIS_URL")
+# החיבור המשותף מ-utils.clients, שנוצר רק בשימוש הראשון
+from .clients import get_redis
 
-# תיקון: מחקנו את ssl_cert_reqs=None שגרם לשגיאה
-r = redis.from_url(redis_url)
+def _redis():
+    # get_redis מחזיר None כשאין Redis; כאן נכשלים בשגיאה ברורה כמו קודם
+    client = get_redis()
+    if client is None:
+        raise RuntimeError("Redis is not configured or unreachable (REDIS_URL / shopipetbot_REDIS_URL)")
+    return client
 
 def save_catalog(data):
-    r.set("shopipet:catalog", json.dumps(data))
+    _redis().set("shopipet:catalog", json.dumps(data))
 
 def get_catalog():
-    data = r.get("shopipet:catalog")
+    data = _redis().get("shopipet:catalog")
     return json.loads(data) if data else []
@@ -0,0 +1,179 @@
+"""
+Order Index
+Normalized phone -> order IDs, kept current by an incremental orders sync
+(modified_after) and by WooCommerce order webhooks, so order status lookups
+fetch orders by ID instead of running WooCommerce's full-text order search.
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from .phone import normalize_phone_il
+
+logger = logging.getLogger(__name__)
+
+# Sorted set per phone: order ID scored by creation time
+PHONE_KEY = "orders:phone:{phone}"
+# Hash order ID -> phones it is indexed under, to move orders whose phone changes
+ORDER_PHONES_KEY = "orders:order_phones"
+# date_modified_gmt of the last synced order, and the page reached within it
+CURSOR_KEY = "orders:index:cursor"
+CURSOR_PAGE_KEY = "orders:index:cursor_page"
+# Set once a sync has gone through every order; until then lookups search
+READY_KEY = "orders:index:ready"
+
+# Orders kept per phone (lookups only show the latest few)
+MAX_ORDERS_PER_PHONE = 20
+
+SYNC_FIELDS = "id,date_created_gmt,date_modified_gmt,billing,shipping"
+PER_PAGE = 100
+
+# Wall-clock budget for one sync call; the cursor is saved after every page
+SYNC_SECONDS = 25
+
+
+def _gmt_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def order_phones(order: dict) -> List[str]:
+    """Normalized billing and shipping phones of an order"""
+    phones = []
+    for section in ("billing", "shipping"):
+        phone = normalize_phone_il((order.get(section) or {}).get("phone"))
+        if phone and phone not in phones:
+            phones.append(phone)
+    return phones
+
+
+def index_order(redis_client, order: dict):
+    """Add or move one order (as returned by the REST API or a webhook)"""
+    order_id = str(order["id"])
+    phones = order_phones(order)
+    previous = redis_client.hget(ORDER_PHONES_KEY, order_id)
+    previous = previous.split(",") if previous else []
+
+    score = _gmt_timestamp(order.get("date_created_gmt"))
+    pipe = redis_client.pipeline()
+    for phone in previous:
+        if phone not in phones:
+            pipe.zrem(PHONE_KEY.format(phone=phone), order_id)
+    for phone in phones:
+        key = PHONE_KEY.format(phone=phone)
+        pipe.zadd(key, {order_id: score})
+        pipe.zremrangebyrank(key, 0, -MAX_ORDERS_PER_PHONE - 1)
+    if phones:
+        pipe.hset(ORDER_PHONES_KEY, order_id, ",".join(phones))
+    else:
+        pipe.hdel(ORDER_PHONES_KEY, order_id)
+    pipe.execute()
+    return phones
+
+
+def remove_order(redis_client, order_id) -> List[str]:
+    """Drop a deleted order from the index; returns the phones it was under"""
+    order_id = str(order_id)
+    phones = redis_client.hget(ORDER_PHONES_KEY, order_id)
+    phones = phones.split(",") if phones else []
+
+    pipe = redis_client.pipeline()
+    for phone in phones:
+        pipe.zrem(PHONE_KEY.format(phone=phone), order_id)
+    pipe.hdel(ORDER_PHONES_KEY, order_id)
+    pipe.execute()
+    return phones
+
+
+async def find_order_ids(redis_client, phone: str, limit: int) -> Optional[List[int]]:
+    """
+    Latest order IDs for a phone
+
+    Args:
+        redis_client: Asyncio Redis client
+
+    Returns:
+        Newest first, or None when the index has not been built yet (the
+        caller should fall back to searching)
+    """
+    if redis_client is None:
+        return None
+    pipe = redis_client.pipeline()
+    pipe.exists(READY_KEY)
+    pipe.zrevrange(PHONE_KEY.format(phone=normalize_phone_il(phone)), 0, limit - 1)
+    built, ids = await pipe.execute()
+    return [int(i) for i in ids] if built else None
+
+
+def sync_order_index(redis_client, wcapi, full: bool = False, budget: float = SYNC_SECONDS) -> dict:
+    """
+    Index orders modified since the last sync
+
+    Pages through orders by modification date and saves the cursor after
+    each page, so a sync cut short by `budget` continues where it stopped.
+    The index is marked ready only when a sync reaches the last page.
+
+    Args:
+        redis_client: Synchronous Redis client
+        wcapi: WooCommerce API instance
+        full: Ignore the cursor and re-index every order
+
+    Returns:
+        {"indexed": n, "pages": n, "complete": bool, "cursor": "..."}
+    """
+    cursor = None if full else redis_client.get(CURSOR_KEY)
+    page = int(redis_client.get(CURSOR_PAGE_KEY) or 1) if cursor else 1
+    deadline = time.monotonic() + budget
+    indexed = pages = 0
+    complete = False
+
+    while time.monotonic() < deadline:
+        params = {
+            "per_page": PER_PAGE,
+            "page": page,
+            "orderby": "modified",
+            "order": "asc",
+            "dates_are_gmt": "true",
+            "_fields": SYNC_FIELDS,
+        }
+        if cursor:
+            # One second of overlap: modified_after is exclusive and re-indexing is harmless
+            since = datetime.fromisoformat(cursor) - timedelta(seconds=1)
+            params["modified_after"] = since.isoformat()
+
+        res = wcapi.get("orders", params=params)
+        if res.status_code != 200:
+            raise RuntimeError(f"WooCommerce Error {res.status_code}: {res.text[:200]}")
+        orders = res.json()
+        pages += 1
+
+        for order in orders:
+            index_order(redis_client, order)
+        indexed += len(orders)
+
+        newest = max((o.get("date_modified_gmt") or "" for o in orders), default="")
+        if len(orders) < PER_PAGE:
+            complete = True
+        if newest and newest != cursor:
+            cursor = newest
+            page = 1
+        elif not complete:
+            # A full page modified within the cursor's second: the cursor
+            # cannot advance, so page through that second instead
+            page += 1
+
+        pipe = redis_client.pipeline()
+        if cursor:
+            pipe.set(CURSOR_KEY, cursor)
+        pipe.set(CURSOR_PAGE_KEY, page)
+        if complete:
+            pipe.set(READY_KEY, "1")
+        pipe.execute()
+
+        if complete:
+            break
+
+    logger.info(f"Order index sync: {indexed} orders in {pages} pages (complete: {complete})")
+    return {"indexed": indexed, "pages": pages, "complete": complete, "cursor": cursor}
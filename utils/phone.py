@@ -0,0 +1,17 @@
+"""
+Phone Numbers
+Normalization shared by OTP keys, SMS dispatch and the order index
+"""
+
+
+def normalize_phone_il(phone):
+    """
+    Digits only, Israeli local prefix replaced by the country code
+
+    "050-123-4567", "0501234567" and "+972 50 123 4567" all become
+    "972501234567".
+    """
+    clean = ''.join(filter(str.isdigit, phone or ''))
+    if clean.startswith('0'):
+        clean = '972' + clean[1:]
+    return clean
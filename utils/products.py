@@ -2,6 +2,7 @@
 Product Formatting Utilities
 Centralized logic for formatting products for OpenAI and frontend display
 """
+import re
 
 
 def safe_int(val, default=0):
@@ -64,6 +65,143 @@ def get_stock_status_text(stock_quantity, status_tag):
         return "אזל מהמלאי"
 
 
+# Number of in-stock variations shown on a product card
+MAX_CARD_VARIATIONS = 3
+
+
+def format_variations_for_card(all_variations: list) -> dict:
+    """
+    Select and format the variations shown on a variable product's card
+
+    Only in-stock, purchasable variations are kept, and at most
+    MAX_CARD_VARIATIONS of them are formatted.
+
+    Args:
+        all_variations: WooCommerce variation dictionaries for one product
+
+    Returns:
+        {"variations": [ProductVariation dicts], "has_more_variations": bool}
+    """
+    in_stock_variations = [
+        v for v in all_variations
+        if v.get('stock_status') == 'instock' and v.get('purchasable', True)
+    ]
+
+    variations = []
+    for v in in_stock_variations[:MAX_CARD_VARIATIONS]:
+        var_name = v.get('name', '')
+        attributes = v.get('attributes', [])
+        attr_text = ', '.join([
+            f"{a.get('name')}: {a.get('option')}"
+            for a in attributes if a.get('option')
+        ])
+
+        variations.append({
+            "id": v.get('id'),
+            "name": attr_text or var_name,
+            "price": f"{v.get('price')} ₪",
+            "regular_price": f"{v.get('regular_price')} ₪",
+            "sale_price": f"{v.get('sale_price')} ₪" if v.get('sale_price') else "",
+            "on_sale": v.get('on_sale', False),
+            "sku": v.get('sku', '')
+        })
+
+    return {
+        "variations": variations,
+        "has_more_variations": len(in_stock_variations) > MAX_CARD_VARIATIONS
+    }
+
+
+# Keys a compact card can carry (see compact_card); `id` is always sent
+COMPACT_CARD_FIELDS = (
+    "id", "name", "price", "regular_price", "sale_price", "image", "url",
+    "sku", "short_description", "type", "variations", "has_more_variations",
+)
+
+
+def price_value(price):
+    """
+    Numeric value of a price, from WooCommerce ("12.90") or a card ("12.90 ₪")
+
+    Returns:
+        int for whole amounts, float otherwise, None when empty or invalid
+    """
+    text = str(price or '').replace('₪', '').strip()
+    if not text:
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+def relative_url(url: str, base_url: str) -> str:
+    """Strip the store origin from a URL under it; other URLs are kept as-is"""
+    base_url = (base_url or '').rstrip('/')
+    if url and base_url and url.startswith(base_url + '/'):
+        return url[len(base_url):]
+    return url
+
+
+def parse_card_fields(fields) -> frozenset:
+    """
+    Parse a `fields=` projection ("name,price,url") into compact card keys
+
+    Unknown keys are ignored; an empty result means no projection.
+    """
+    if not fields:
+        return frozenset()
+    return frozenset(f.strip() for f in fields.split(',') if f.strip() in COMPACT_CARD_FIELDS)
+
+
+def compact_card(card: dict, base_url: str = "", fields: frozenset = frozenset()) -> dict:
+    """
+    Shrink a product card to what the widget renders
+
+    Prices become numbers, the regular/sale pair is only sent for products on
+    sale, URLs are made relative to the store and empty values are dropped.
+    The add-to-cart URL is left out; the widget posts the product ID itself.
+
+    Args:
+        card: Product card as built by chat_router.build_cards
+        base_url: Store URL the relative URLs are resolved against
+        fields: Optional projection (see parse_card_fields); `id` is always kept
+
+    Returns:
+        Compact card dictionary
+    """
+    compact = {
+        "id": card.get('id'),
+        "name": card.get('name'),
+        "price": price_value(card.get('price')),
+    }
+    if card.get('on_sale'):
+        compact["regular_price"] = price_value(card.get('regular_price'))
+        compact["sale_price"] = price_value(card.get('sale_price'))
+    if card.get('image'):
+        compact["image"] = relative_url(card['image'], base_url)
+    if card.get('permalink'):
+        compact["url"] = relative_url(card['permalink'], base_url)
+    if card.get('sku'):
+        compact["sku"] = card['sku']
+    if card.get('short_description'):
+        compact["short_description"] = card['short_description']
+
+    if card.get('type', 'simple') != 'simple':
+        compact["type"] = card['type']
+        compact["variations"] = [
+            {"id": v.get('id'), "name": v.get('name'), "price": price_value(v.get('price'))}
+            for v in card.get('variations') or []
+        ]
+        if card.get('has_more_variations'):
+            compact["has_more_variations"] = True
+
+    if fields:
+        compact = {k: v for k, v in compact.items() if k == 'id' or k in fields}
+    return compact
+
+
 def format_product_for_ai(product: dict) -> str:
     """
     Format a WooCommerce product dictionary into text for OpenAI Vector Store
@@ -187,3 +325,166 @@ def format_product_for_ai(product: dict) -> str:
     lines.append("------------\n")
 
     return "\n".join(lines)
+
+
+# Compact profile: one short line per product for the catalog files. Keys are
+# explained in a legend instead of being spelled out on every product.
+COMPACT_LEGEND = (
+    "מוצרים - id: מזהה ל-show_products, n: שם, b: מותג, c: קטגוריות, p: מחיר ₪, "
+    "was: מחיר לפני מבצע, sale_to: סוף מבצע, stock: in/low:N/out, w: משקל, "
+    "attr: מאפיינים, tags: תגיות, pop: פופולריות, code: מק\"ט/ברקוד, d: תיאור"
+)
+
+# file_search retrieves ~800-token chunks of a file, so the legend is repeated
+# often enough for every chunk to carry it
+COMPACT_LEGEND_EVERY = 8  # products
+
+# Longest description a product gets, and the average per product a catalog
+# file may spend on descriptions (see compact_description_budgets)
+COMPACT_DESCRIPTION_CHARS = 400
+COMPACT_DESCRIPTION_BUDGET = 160
+COMPACT_DESCRIPTION_MIN = 60  # Kept for every product, however low it ranks
+
+
+def _plain_text(html: str) -> str:
+    return ' '.join(re.sub(r'<[^>]+>', ' ', html or '').replace('&nbsp;', ' ').split())
+
+
+def _truncate(text: str, chars: int) -> str:
+    if len(text) <= chars:
+        return text
+    if chars <= 1:
+        return ""
+    cut = text[:chars - 1]
+    return (cut.rsplit(' ', 1)[0] if ' ' in cut else cut) + "…"
+
+
+def _sales_tier(product: dict) -> int:
+    """Sales rank as get_sales_rank buckets it (2 = best seller)"""
+    count = safe_int(product.get('total_sales'))
+    return 2 if count >= 20 else 1 if count >= 5 else 0
+
+
+def _collapse_categories(names: list) -> list:
+    """
+    Drop categories already implied by a more specific one on the product
+
+    Stores assign both a parent and its child ("כלבים", "מזון לכלבים") or
+    full paths ("כלבים > מזון", "כלבים"); only the most specific names are kept.
+    """
+    names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+    return [
+        name for name in names
+        if not any(other != name and name in other for other in names)
+    ]
+
+
+def _description(product: dict) -> str:
+    return _plain_text(f"{product.get('short_description', '')} {product.get('description', '')}")
+
+
+def compact_description_budgets(products: list, average_chars: int = COMPACT_DESCRIPTION_BUDGET) -> dict:
+    """
+    Split a catalog file's description budget across its products, best sellers first
+
+    The file may spend `average_chars` per product. Going down the sales
+    ranking, each product takes what its description needs, up to
+    COMPACT_DESCRIPTION_CHARS and twice its fair share of what is left, so
+    short descriptions leave room for the others; COMPACT_DESCRIPTION_MIN is
+    held back for every product further down. Ranking uses the sales-rank
+    tiers rather than raw sales, so budgets (and shard hashes) only change
+    when a product changes tier.
+
+    Returns:
+        Dict of product ID -> description characters
+    """
+    ranked = sorted(products, key=lambda p: (-_sales_tier(p), safe_int(p.get('id'))))
+    remaining = average_chars * len(ranked)
+    budgets = {}
+    for position, product in enumerate(ranked):
+        left = len(ranked) - position
+        share = min(2 * (remaining // left), remaining - COMPACT_DESCRIPTION_MIN * (left - 1))
+        chars = min(len(_description(product)), COMPACT_DESCRIPTION_CHARS, max(COMPACT_DESCRIPTION_MIN, share))
+        budgets[product.get('id')] = chars
+        remaining -= chars
+    return budgets
+
+
+def _compact_price(value) -> str:
+    value = price_value(value)
+    return "" if value is None else str(value)
+
+
+def format_product_compact(product: dict, description_chars: int = COMPACT_DESCRIPTION_CHARS) -> str:
+    """
+    Format a product as one compact line (see COMPACT_LEGEND for the keys)
+
+    Carries the same facts as format_product_for_ai without the separators,
+    "(INTERNAL)" tag and direct link; empty fields are left out and
+    categories implied by a more specific one are collapsed.
+
+    Args:
+        product: WooCommerce product dictionary
+        description_chars: Description length limit (0 leaves it out)
+
+    Returns:
+        One line of "key: value" pairs separated by "; "
+    """
+    fields = [("id", str(product.get('id'))), ("n", product.get('name', ''))]
+
+    brands = [b['name'] for b in product.get('brands', [])]
+    fields.append(("b", ", ".join(brands)))
+    fields.append(("c", ", ".join(_collapse_categories([c['name'] for c in product.get('categories', [])]))))
+
+    fields.append(("p", _compact_price(product.get('price'))))
+    if product.get('on_sale'):
+        fields.append(("was", _compact_price(product.get('regular_price'))))
+        if product.get('date_on_sale_to'):
+            fields.append(("sale_to", str(product['date_on_sale_to'])[:10]))
+
+    if product.get('stock_status') != 'instock':
+        stock = "out"
+    else:
+        qty = product.get('stock_quantity')
+        stock = f"low:{safe_int(qty)}" if qty is not None and 1 <= safe_int(qty) <= 3 else "in"
+    fields.append(("stock", stock))
+
+    weight = safe_float(product.get('weight'))
+    if weight > 0:
+        fields.append(("w", f"{int(weight * 1000)}g" if weight < 1.0 else f"{weight:g}kg"))
+
+    fields.append(("attr", " | ".join(
+        f"{a.get('name')}: {', '.join(a.get('options', []))}" for a in product.get('attributes', [])
+    )))
+    fields.append(("tags", ", ".join(t['name'] for t in product.get('tags', []))))
+    fields.append(("pop", get_sales_rank(product.get('total_sales'))))
+
+    codes = [str(product.get('sku') or '')] + [
+        str(m.get('value')) for m in product.get('meta_data', [])
+        if any(k in str(m.get('key', '')).lower() for k in ['gtin', 'ean', 'isbn', 'upc', 'barcode'])
+    ]
+    fields.append(("code", ", ".join(c for c in codes if c)))
+
+    fields.append(("d", _truncate(_description(product), description_chars)))
+
+    return "; ".join(f"{key}: {value}" for key, value in fields if value)
+
+
+def format_catalog_compact(products: list) -> str:
+    """
+    Catalog file text in the compact profile
+
+    One line per product, with the legend every COMPACT_LEGEND_EVERY
+    products and descriptions cut to compact_description_budgets().
+
+    The text is embedded once at sync time and file_search picks chunks by
+    the shopper's query, so fields cannot be chosen per query here; the
+    savings come from short keys, collapsed categories and the budget.
+    """
+    budgets = compact_description_budgets(products)
+    lines = []
+    for position, product in enumerate(products):
+        if position % COMPACT_LEGEND_EVERY == 0:
+            lines.append(COMPACT_LEGEND)
+        lines.append(format_product_compact(product, budgets.get(product.get('id'), COMPACT_DESCRIPTION_CHARS)))
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""
+Rate Limiting
+Sliding-window limits on Redis sorted sets, checked and recorded atomically
+in one Lua script so concurrent requests on several instances cannot slip
+past a limit together.
+"""
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Every window is checked before any is recorded, so a request rejected by
+# one limit does not use up the others.
+# KEYS: one sorted set per limit
+# ARGV: now (ms), member, then limit and window (ms) for each key
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i + 1])
+    local window = tonumber(ARGV[2 * i + 2])
+    redis.call('zremrangebyscore', key, '-inf', now - window)
+    if redis.call('zcard', key) >= limit then
+        local oldest = redis.call('zrange', key, 0, 0, 'withscores')
+        return {0, i, tonumber(oldest[2]) + window - now}
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('zadd', key, now, ARGV[2])
+    redis.call('pexpire', key, ARGV[2 * i + 2])
+end
+return {1, 0, 0}
+"""
+
+
+@dataclass
+class Limit:
+    """At most `limit` events per `window` seconds for one key"""
+    key: str
+    limit: int
+    window: float
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: Optional[Limit] = None  # The limit that rejected the request
+    retry_after: float = 0.0  # Seconds until the oldest event leaves its window
+
+
+async def hit(redis_client, limits: List[Limit]) -> RateLimitResult:
+    """
+    Record one event against every limit, unless any of them is exhausted
+
+    Args:
+        redis_client: Asyncio Redis client
+        limits: Limits to check together
+
+    Returns:
+        RateLimitResult; when not allowed nothing was recorded
+    """
+    args: List = [int(time.time() * 1000), uuid.uuid4().hex]
+    for limit in limits:
+        args += [limit.limit, int(limit.window * 1000)]
+
+    allowed, index, retry_ms = await redis_client.eval(
+        SLIDING_WINDOW_SCRIPT, len(limits), *[limit.key for limit in limits], *args
+    )
+    if allowed:
+        return RateLimitResult(True)
+    return RateLimitResult(False, limits[int(index) - 1], max(int(retry_ms), 0) / 1000)
+
+
+async def lockout_remaining(redis_client, key: str) -> float:
+    """Seconds left on a lockout key (0 when not locked)"""
+    ttl_ms = await redis_client.pttl(key)
+    return ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0.0
+
+
+def client_ip(headers, fallback: str = "") -> str:
+    """
+    The caller's address behind Vercel's proxy
+
+    Vercel overwrites X-Forwarded-For with the real client address, so
+    its first entry cannot be spoofed there.
+    """
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return headers.get("x-real-ip") or fallback or "unknown"
+
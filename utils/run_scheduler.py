@@ -0,0 +1,280 @@
+"""
+Per-Thread Run Scheduler
+Serializes assistant runs on the same thread and merges messages that arrive
+while a run is active into the next run, via Redis or in process.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Longest a run may hold a thread without renewing it (runs time out at 120 s)
+LOCK_TTL_MS = 150000
+
+# Seconds between lock renewals while a run is going
+LOCK_RENEW_INTERVAL = 30.0
+
+# Queued messages outlive the lock so they are never dropped by expiry first
+QUEUE_TTL_SECONDS = 300
+
+# Longest a request waits for the thread before giving up
+WAIT_TIMEOUT = 150.0
+
+POLL_INTERVAL = 0.1  # seconds
+
+# Compare-and-delete so a holder never releases a lock that expired and was re-taken
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend a lock only while its holder still owns it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class ThreadBusyError(RuntimeError):
+    """Raised when a thread stays locked longer than the wait timeout"""
+
+
+@dataclass
+class Ticket:
+    """One request's place on a thread"""
+    thread_id: str
+    message: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    acquired: bool = False
+    position: int = 0  # Messages queued ahead of this one (0 when it runs immediately)
+    shared: bool = False  # Coordinated through Redis
+    renewed_at: float = 0.0  # When the Redis lock was last taken or renewed (monotonic)
+
+
+def merge_messages(messages: List[str]) -> str:
+    """Join messages sent while the thread was busy into one user message"""
+    return "\n".join(m.strip() for m in messages if m and m.strip())
+
+
+class ThreadRunScheduler:
+    """
+    One active run per thread, with a queue for messages sent meanwhile
+
+    Usage:
+        ticket = await scheduler.enqueue(thread_id, message)
+        if not ticket.acquired:
+            ...tell the client it is queued...
+        messages = await scheduler.acquire(ticket)
+        if messages is None:
+            ...another request already answered this message; nothing to release...
+        try:
+            ...run the assistant on merge_messages(messages), calling
+            await scheduler.renew(ticket) as it goes...
+        finally:
+            await scheduler.release(ticket)
+
+    Whoever takes the thread lock drains the whole queue, so messages sent
+    while a run is active go out together in the next run. Requests whose
+    message was drained by someone else get None from acquire(). With Redis
+    the lock (`chat:thread:{id}:lock`) and queue (`chat:thread:{id}:queue`)
+    are shared across instances; otherwise threads are tracked in process.
+    """
+
+    def __init__(
+        self,
+        redis_getter: Optional[Callable[[], Any]] = None,
+        lock_ttl_ms: int = LOCK_TTL_MS,
+        wait_timeout: float = WAIT_TIMEOUT
+    ):
+        self.redis_getter = redis_getter
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        # In-process fallback: threads with an active run, and per-thread state
+        self._active: Set[str] = set()
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._queues: Dict[str, List[Ticket]] = {}
+        self._users: Dict[str, int] = {}
+
+    def _redis(self):
+        return self.redis_getter() if self.redis_getter else None
+
+    @staticmethod
+    def _keys(thread_id: str):
+        return f"chat:thread:{thread_id}:lock", f"chat:thread:{thread_id}:queue"
+
+    async def enqueue(self, thread_id: str, message: str) -> Ticket:
+        """Queue a message and take the thread if it is free"""
+        ticket = Ticket(thread_id=thread_id, message=message)
+        redis_client = self._redis()
+
+        if redis_client is not None:
+            try:
+                await self._enqueue_redis(redis_client, ticket)
+                return ticket
+            except Exception as e:
+                logger.warning(f"Run scheduler Redis error ({e}), using in-process lock")
+
+        ticket.position = len(self._queues.get(thread_id, []))
+        self._queues.setdefault(thread_id, []).append(ticket)
+        self._users[thread_id] = self._users.get(thread_id, 0) + 1
+
+        if thread_id not in self._active:
+            self._active.add(thread_id)
+            ticket.acquired = True
+        return ticket
+
+    async def _enqueue_redis(self, redis_client, ticket: Ticket):
+        lock_key, queue_key = self._keys(ticket.thread_id)
+        entry = json.dumps({"id": ticket.id, "message": ticket.message}, ensure_ascii=False)
+
+        pipe = redis_client.pipeline()
+        pipe.rpush(queue_key, entry)
+        pipe.expire(queue_key, QUEUE_TTL_SECONDS)
+        length, _ = await pipe.execute()
+
+        ticket.position = length - 1
+        ticket.acquired = bool(await redis_client.set(lock_key, ticket.id, nx=True, px=self.lock_ttl_ms))
+        ticket.renewed_at = time.monotonic()
+        ticket.shared = True
+
+    async def acquire(self, ticket: Ticket) -> Optional[List[str]]:
+        """
+        Wait for the thread, then drain its queue
+
+        Returns:
+            Messages to send in this run (oldest first, including this
+            ticket's), or None if an earlier request already sent this message
+            (the thread is released again in that case).
+
+        Raises:
+            ThreadBusyError: The thread stayed busy for longer than wait_timeout
+        """
+        if ticket.shared:
+            return await self._acquire_redis(ticket)
+
+        thread_id = ticket.thread_id
+        if not ticket.acquired:
+            condition = self._conditions.setdefault(thread_id, asyncio.Condition())
+            try:
+                async with condition:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: thread_id not in self._active),
+                        self.wait_timeout
+                    )
+                    self._active.add(thread_id)
+            except asyncio.TimeoutError:
+                self._drop_local(ticket)
+                raise ThreadBusyError(f"Thread {thread_id} is busy")
+            ticket.acquired = True
+
+        queue = self._queues.get(thread_id, [])
+        if ticket not in queue:
+            await self.release(ticket)
+            return None
+
+        drained = list(queue)
+        queue.clear()
+        return [t.message for t in drained]
+
+    async def _acquire_redis(self, ticket: Ticket) -> Optional[List[str]]:
+        redis_client = self._redis()
+        lock_key, queue_key = self._keys(ticket.thread_id)
+        deadline = time.monotonic() + self.wait_timeout
+
+        while not ticket.acquired:
+            if time.monotonic() > deadline:
+                await self._drop_redis(redis_client, ticket)
+                raise ThreadBusyError(f"Thread {ticket.thread_id} is busy")
+            await asyncio.sleep(POLL_INTERVAL)
+            ticket.acquired = bool(await redis_client.set(lock_key, ticket.id, nx=True, px=self.lock_ttl_ms))
+            ticket.renewed_at = time.monotonic()
+
+        # Only the lock holder removes entries, and others only append, so
+        # trimming what was read cannot drop a message pushed in between
+        entries = await redis_client.lrange(queue_key, 0, -1)
+        drained = [json.loads(e) for e in entries]
+        if not any(e["id"] == ticket.id for e in drained):
+            await self.release(ticket)
+            return None
+
+        await redis_client.ltrim(queue_key, len(entries), -1)
+        return [e["message"] for e in drained]
+
+    async def _drop_redis(self, redis_client, ticket: Ticket):
+        """Take a ticket that gave up waiting out of the queue, so no later run sends its message"""
+        _, queue_key = self._keys(ticket.thread_id)
+        entry = json.dumps({"id": ticket.id, "message": ticket.message}, ensure_ascii=False)
+        try:
+            await redis_client.lrem(queue_key, 1, entry)
+        except Exception as e:
+            logger.warning(f"Failed to drop queued message from {queue_key}: {e}")
+
+    async def renew(self, ticket: Ticket) -> bool:
+        """
+        Keep the thread lock while the run is still going
+
+        Cheap to call on every poll or stream event: Redis is only asked
+        every LOCK_RENEW_INTERVAL seconds.
+
+        Returns:
+            False if the lock expired and another request may have the thread
+        """
+        if not ticket.acquired:
+            return False
+        now = time.monotonic()
+        if not ticket.shared or now - ticket.renewed_at < LOCK_RENEW_INTERVAL:
+            return True
+
+        lock_key, _ = self._keys(ticket.thread_id)
+        try:
+            renewed = bool(await self._redis().eval(RENEW_SCRIPT, 1, lock_key, ticket.id, self.lock_ttl_ms))
+        except Exception as e:
+            logger.warning(f"Failed to renew thread lock {lock_key}: {e}")
+            return True
+        ticket.renewed_at = now
+        if not renewed:
+            logger.warning(f"Thread lock {lock_key} expired while its run was still going")
+        return renewed
+
+    async def release(self, ticket: Ticket):
+        """Free the thread for the next queued request (safe to call more than once)"""
+        if not ticket.acquired:
+            return
+        ticket.acquired = False
+
+        if ticket.shared:
+            lock_key, _ = self._keys(ticket.thread_id)
+            try:
+                await self._redis().eval(RELEASE_SCRIPT, 1, lock_key, ticket.id)
+            except Exception as e:
+                logger.warning(f"Failed to release thread lock {lock_key}: {e}")
+            return
+
+        self._active.discard(ticket.thread_id)
+        condition = self._conditions.get(ticket.thread_id)
+        if condition is not None:
+            async with condition:
+                condition.notify()
+        self._drop_local(ticket)
+
+    def _drop_local(self, ticket: Ticket):
+        """Forget per-thread state once no request is using it"""
+        thread_id = ticket.thread_id
+        queue = self._queues.get(thread_id, [])
+        if ticket in queue:
+            queue.remove(ticket)
+
+        self._users[thread_id] = self._users.get(thread_id, 1) - 1
+        if self._users[thread_id] <= 0 and thread_id not in self._active:
+            self._users.pop(thread_id, None)
+            self._conditions.pop(thread_id, None)
+            self._queues.pop(thread_id, None)
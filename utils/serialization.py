@@ -0,0 +1,86 @@
+"""
+JSON Serialization
+One place for encoding response bodies and SSE payloads: orjson when it is
+installed, the stdlib otherwise, plus RawJSON for values serialized once
+(e.g. cached product cards) and spliced into later payloads as-is.
+"""
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib encoder gives the same JSON
+    orjson = None
+
+
+class RawJSON:
+    """
+    Already-serialized JSON, written verbatim by `dumps`
+
+    Only create these from output of `dumps` (or another trusted encoder):
+    the text is not checked.
+    """
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self):
+        return f"RawJSON({self.text[:40]!r})"
+
+
+def _encode(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _contains_raw(obj: Any) -> bool:
+    if isinstance(obj, RawJSON):
+        return True
+    if isinstance(obj, dict):
+        return any(_contains_raw(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_raw(v) for v in obj)
+    return False
+
+
+def _splice(obj: Any) -> str:
+    if isinstance(obj, RawJSON):
+        return obj.text
+    if isinstance(obj, dict) and _contains_raw(obj):
+        return "{" + ",".join(f"{_encode(str(k))}:{_splice(v)}" for k, v in obj.items()) + "}"
+    if isinstance(obj, (list, tuple)) and _contains_raw(obj):
+        return "[" + ",".join(_splice(v) for v in obj) + "]"
+    return _encode(obj)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serialize to compact JSON text (UTF-8 kept as-is, not \\u-escaped)
+
+    RawJSON values anywhere in dicts and lists are spliced in without being
+    parsed or re-encoded; payloads without them take a single encoder call.
+    """
+    return _splice(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """`dumps` encoded as UTF-8, for response bodies"""
+    if orjson is not None and not _contains_raw(obj):
+        return orjson.dumps(obj)
+    return dumps(obj).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `dumps_bytes`
+
+    Returning it from an endpoint also skips FastAPI's response_model
+    validation, which is only wasted work for payloads the server built.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
@@ -0,0 +1,163 @@
+"""
+Request Coalescing (single-flight)
+Merges identical concurrent upstream calls into one call whose result is
+shared by every caller, in process and optionally across instances via Redis.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# A leader holding the Redis lock longer than this is assumed dead
+LOCK_TTL_MS = 15000
+
+# Followers on other instances read the leader's result within this window
+RESULT_TTL_MS = 5000
+
+POLL_INTERVAL = 0.05  # seconds
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key
+
+    Within a process, the first caller for a key becomes the leader and runs
+    the call; callers arriving while it is in flight await the same future.
+    With a Redis client, instances also coordinate through a short lock:
+    the instance that takes `sf:{namespace}:lock:{key}` runs the call and publishes the
+    JSON result, and the others wait for it instead of calling upstream.
+    Results must therefore be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_getter: Optional[Callable[[], Any]] = None,
+        lock_ttl_ms: int = LOCK_TTL_MS,
+        result_ttl_ms: int = RESULT_TTL_MS
+    ):
+        self.namespace = namespace
+        self.redis_getter = redis_getter
+        self.lock_ttl_ms = lock_ttl_ms
+        self.result_ttl_ms = result_ttl_ms
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn` once for all concurrent callers of `key`
+
+        Args:
+            key: Identity of the call (equal keys must mean equal requests)
+            fn: Coroutine function performing the upstream call
+
+        Returns:
+            The shared result. Exceptions raised by the leader propagate to
+            every waiter.
+        """
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader's request was cancelled - take over the call
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            result = await self._lead(key, fn)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _lead(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the call, coordinating with other instances when Redis is available"""
+        redis_client = self.redis_getter() if self.redis_getter else None
+        if redis_client is None:
+            return await fn()
+
+        lock_key = f"sf:{self.namespace}:lock:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await redis_client.set(lock_key, token, nx=True, px=self.lock_ttl_ms)
+            leader_token = token if acquired else await redis_client.get(lock_key)
+        except Exception as e:
+            logger.warning(f"Single-flight lock unavailable, calling upstream directly: {e}")
+            return await fn()
+
+        if acquired or leader_token is None:
+            return await self._run_and_publish(redis_client, key, lock_key, token, fn, acquired)
+
+        shared = await self._wait_for_result(redis_client, key, lock_key, leader_token)
+        if shared is not None:
+            return shared
+
+        # Leader vanished or was too slow - do the call ourselves
+        return await fn()
+
+    async def _run_and_publish(self, redis_client, key, lock_key, token, fn, locked):
+        """Run the call as the cross-instance leader and share its result"""
+        if not locked:
+            return await fn()
+
+        try:
+            result = await fn()
+        except BaseException:
+            # Let followers fall back to their own call right away
+            try:
+                await redis_client.delete(lock_key)
+            except Exception:
+                pass
+            raise
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.set(
+                f"sf:{self.namespace}:result:{key}:{token}",
+                json.dumps(result),
+                px=self.result_ttl_ms
+            )
+            pipe.delete(lock_key)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish single-flight result: {e}")
+
+        return result
+
+    async def _wait_for_result(self, redis_client, key, lock_key, leader_token):
+        """Poll for the leader's published result until its lock goes away"""
+        result_key = f"sf:{self.namespace}:result:{key}:{leader_token}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl_ms / 1000
+
+        try:
+            while loop.time() < deadline:
+                payload = await redis_client.get(result_key)
+                if payload is not None:
+                    return json.loads(payload)
+
+                if await redis_client.get(lock_key) != leader_token:
+                    # Lock released or expired; the result may have landed just before
+                    payload = await redis_client.get(result_key)
+                    return json.loads(payload) if payload is not None else None
+
+                await asyncio.sleep(POLL_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Single-flight wait failed: {e}")
+
+        return None
@@ -0,0 +1,76 @@
+"""
+SMS
+Async Flashy SMS client on a pooled httpx connection, with timeouts and
+retries so a slow provider cannot hold an event-loop worker.
+"""
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+FLASHY_SMS_URL = "https://flashyapp.com/api/2.0/sms/send"
+
+SMS_TIMEOUT = httpx.Timeout(8.0, connect=3.0)
+SMS_RETRIES = 2
+RETRY_BACKOFF = 0.3  # seconds, doubled per attempt
+
+
+class SMSError(RuntimeError):
+    """Raised when the provider rejects a message or stays unreachable"""
+
+
+class FlashySMSClient:
+    """
+    Sends SMS through Flashy
+
+    Connection errors, timeouts and 5xx answers are retried; other errors
+    are raised right away. Flashy has no idempotency key, so a timeout
+    after the request was sent may deliver the message twice; for OTP
+    codes that is preferable to not delivering it.
+    """
+
+    def __init__(self, api_key: str, sender_id: str, url: str = FLASHY_SMS_URL,
+                 timeout: httpx.Timeout = SMS_TIMEOUT, retries: int = SMS_RETRIES):
+        self.api_key = api_key
+        self.sender_id = sender_id
+        self.url = url
+        self.retries = retries
+        self.http = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_keepalive_connections=5))
+
+    async def send(self, to: str, message: str):
+        """
+        Send one SMS
+
+        Args:
+            to: Normalized phone number (see utils.phone.normalize_phone_il)
+            message: Message text
+
+        Raises:
+            SMSError: The provider rejected the message or was unreachable
+        """
+        payload = {"token": self.api_key, "from": self.sender_id, "to": to, "message": message}
+
+        for attempt in range(self.retries + 1):
+            try:
+                res = await self.http.post(self.url, json=payload)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if res.status_code == 200:
+                    return
+                error = f"HTTP {res.status_code}: {res.text[:200]}"
+                if res.status_code < 500:
+                    logger.error(f"Flashy Error: {error}")
+                    raise SMSError("SMS Provider Error")
+
+            if attempt < self.retries:
+                logger.warning(f"Flashy send failed ({error}), retrying")
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+        logger.error(f"Flashy Error: {error}")
+        raise SMSError("SMS Provider Error")
+
+    async def close(self):
+        await self.http.aclose()
@@ -0,0 +1,189 @@
+"""
+Server-Sent Events Framing
+Coalesces small text deltas into fewer SSE frames and keeps idle streams alive
+"""
+import asyncio
+import time
+from typing import AsyncGenerator, AsyncIterator, List, Optional
+
+from .serialization import dumps
+
+
+# Flush buffered text after this many seconds or bytes, whichever comes first
+FLUSH_INTERVAL = 0.03
+FLUSH_BYTES = 64
+
+# Send a comment frame when nothing was written for this many seconds
+HEARTBEAT_INTERVAL = 10.0
+
+# Reconnect delay suggested to the client (milliseconds)
+RETRY_MS = 3000
+
+HEARTBEAT_FRAME = ": ping\n\n"
+
+
+def format_event(payload: dict, event_id: Optional[int] = None) -> str:
+    """
+    Format a single SSE frame
+
+    Args:
+        payload: JSON-serializable event payload (may contain RawJSON)
+        event_id: Optional event ID (sent as the `id:` field)
+
+    Returns:
+        SSE frame text terminated by a blank line
+    """
+    data = dumps(payload)
+    if event_id is None:
+        return f"data: {data}\n\n"
+    return f"id: {event_id}\ndata: {data}\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Parse a Last-Event-ID header value, returning 0 when missing or invalid"""
+    try:
+        return max(int(value), 0) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def frame_event_id(frame: str) -> Optional[int]:
+    """Return the event ID of a frame built by `format_event`, or None"""
+    if not frame.startswith("id: "):
+        return None
+    return int(frame[4:frame.index("\n")])
+
+
+class SSEFramer:
+    """
+    Turns chat events into SSE frames
+
+    Text events are buffered and merged into a single frame once the buffer
+    reaches `flush_bytes` or has been open for `flush_interval` seconds.
+    Any other event flushes pending text first so ordering is preserved.
+    Every data frame carries a monotonically increasing event ID.
+    """
+
+    def __init__(
+        self,
+        last_event_id: int = 0,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_bytes: int = FLUSH_BYTES,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL
+    ):
+        self.last_event_id = last_event_id
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.heartbeat_interval = heartbeat_interval
+
+        self._text: List[str] = []
+        self._text_bytes = 0
+        self._text_started = 0.0
+
+    def frame(self, payload: dict) -> str:
+        """Format a payload as the next numbered frame"""
+        self.last_event_id += 1
+        return format_event(payload, self.last_event_id)
+
+    def feed(self, event: dict) -> List[str]:
+        """
+        Add an event and return the frames that are ready to be written
+
+        Args:
+            event: Chat event dict, e.g. {"type": "text", "content": "..."}
+
+        Returns:
+            List of frames (possibly empty while text is being buffered)
+        """
+        if event.get("type") == "text":
+            content = event.get("content")
+            if not content:
+                return []
+
+            if not self._text:
+                self._text_started = time.monotonic()
+            self._text.append(content)
+            self._text_bytes += len(content.encode("utf-8"))
+
+            if self._text_bytes >= self.flush_bytes:
+                return [self.flush_text()]
+            return []
+
+        frames = []
+        if self._text:
+            frames.append(self.flush_text())
+        frames.append(self.frame(event))
+        return frames
+
+    def flush_text(self) -> Optional[str]:
+        """Emit buffered text as one frame, or None if nothing is buffered"""
+        if not self._text:
+            return None
+
+        content = "".join(self._text)
+        self._text = []
+        self._text_bytes = 0
+        return self.frame({"type": "text", "content": content})
+
+    def next_timeout(self) -> float:
+        """Seconds until the framer needs to write something on its own"""
+        if self._text:
+            elapsed = time.monotonic() - self._text_started
+            return max(self.flush_interval - elapsed, 0.0)
+        return self.heartbeat_interval
+
+    def on_idle(self) -> str:
+        """Called when `next_timeout` expired without a new event"""
+        return self.flush_text() or HEARTBEAT_FRAME
+
+
+async def sse_frames(
+    events: AsyncIterator[dict],
+    framer: Optional[SSEFramer] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Frame an async stream of chat events as SSE
+
+    Waits on the event source with a timeout so buffered text is flushed on
+    time and heartbeat comments are written during long upstream waits
+    (e.g. while a tool call is being served).
+
+    Args:
+        events: Async iterator of chat event dicts
+        framer: Optional pre-configured framer (e.g. resuming from an event ID)
+
+    Yields:
+        SSE frame strings
+    """
+    framer = framer or SSEFramer()
+    iterator = events.__aiter__()
+    pending = None
+
+    yield f"retry: {RETRY_MS}\n\n"
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            done, _ = await asyncio.wait({pending}, timeout=framer.next_timeout())
+            if not done:
+                yield framer.on_idle()
+                continue
+
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+
+            for frame in framer.feed(event):
+                yield frame
+
+        tail = framer.flush_text()
+        if tail:
+            yield tail
+
+    finally:
+        if pending is not None:
+            pending.cancel()
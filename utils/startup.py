@@ -0,0 +1,100 @@
+"""
+Cold Start Profiling
+Import timings for the serverless entry point, reported by /api/health.
+The -X importtime breakdown spawns an interpreter, so it is CLI-only:
+    python -m utils.startup [module]
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Imported first by api/index.py, so this is roughly when the entry point started loading
+PROCESS_START = time.perf_counter()
+
+# Modules that should stay out of a cold start (loaded on first use instead)
+HEAVY_MODULES = ("openai", "woocommerce", "redis", "numpy", "httpx", "requests")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_phases: Dict[str, float] = {}
+_ready_at = None
+
+
+@contextmanager
+def import_phase(name: str):
+    """Time one step of the entry point's module-level setup"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = time.perf_counter() - start
+
+
+def mark_ready():
+    """Call once the app object is fully configured"""
+    global _ready_at
+    _ready_at = time.perf_counter()
+
+
+def startup_report() -> dict:
+    """In-process view of the cold start: phase timings and what got imported"""
+    return {
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in _phases.items()},
+        "ready_ms": round((_ready_at - PROCESS_START) * 1000, 1) if _ready_at else None,
+        "modules_loaded": len(sys.modules),
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def importtime_profile(module: str = "api.index", top: int = 25, timeout: float = 30.0) -> dict:
+    """
+    Import `module` in a fresh interpreter under `-X importtime`
+
+    Args:
+        module: Module to import
+        top: Number of entries to return, by cumulative time
+        timeout: Seconds before the child process is abandoned
+
+    Returns:
+        {"total_ms": float, "modules": [{"module", "self_ms", "cumulative_ms", "depth"}]}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
+    entries: List[dict] = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append({
+            "module": name,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+            "depth": (len(indent) - 1) // 2,
+        })
+
+    total = next((e["cumulative_ms"] for e in entries if e["module"] == module), None)
+    entries.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+
+    return {
+        "total_ms": total,
+        "returncode": result.returncode,
+        "modules": entries[:top],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(importtime_profile(*sys.argv[1:2]), indent=2))
@@ -0,0 +1,158 @@
+"""
+Resumable Stream Buffer
+Stores the SSE frames of a chat response in a Redis Stream so a client that
+lost its connection can replay missed frames and follow the live tail
+instead of starting a new run.
+"""
+import asyncio
+import logging
+import uuid
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+from .sse import HEARTBEAT_FRAME, frame_event_id
+
+logger = logging.getLogger(__name__)
+
+# Buffered streams expire shortly after the run ends
+STREAM_TTL = 300  # seconds
+STREAM_MAXLEN = 5000
+
+# How long a reconnecting client may follow a stream that is still being written
+FOLLOW_TIMEOUT = 120  # seconds
+FOLLOW_BLOCK_MS = 10000
+
+END_FIELD = "end"
+FRAME_FIELD = "frame"
+
+# Keep references to running pumps so they are not garbage collected
+_pumps = set()
+
+
+def new_stream_id() -> str:
+    """Generate an opaque ID for a buffered response stream"""
+    return uuid.uuid4().hex
+
+
+class StreamBuffer:
+    """
+    Redis Stream holding the frames of one chat response
+
+    Entry IDs are `0-<event id>`, so the SSE event ID of a frame is also its
+    position in the stream and Last-Event-ID maps directly onto XRANGE/XREAD.
+    """
+
+    def __init__(self, redis_client, stream_id: str, ttl: int = STREAM_TTL):
+        self.redis = redis_client
+        self.stream_id = stream_id
+        self.key = f"chat:stream:{stream_id}"
+        self.ttl = ttl
+
+    async def append(self, event_id: int, frame: str):
+        """Store a data frame under its event ID"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(
+            self.key,
+            {FRAME_FIELD: frame},
+            id=f"0-{event_id}",
+            maxlen=STREAM_MAXLEN,
+            approximate=True
+        )
+        pipe.expire(self.key, self.ttl)
+        await pipe.execute()
+
+    async def close(self):
+        """Mark the stream as complete so followers stop waiting"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(self.key, {END_FIELD: "1"}, maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.expire(self.key, self.ttl)
+        await pipe.execute()
+
+    async def exists(self) -> bool:
+        """Check whether the stream is still buffered"""
+        return bool(await self.redis.exists(self.key))
+
+    async def replay(self, last_event_id: int = 0) -> AsyncGenerator[str, None]:
+        """
+        Yield frames after `last_event_id`, then follow the live tail
+
+        Stops at the end marker, or after FOLLOW_TIMEOUT if the writer died.
+        Heartbeat comments are yielded while waiting for new frames.
+        """
+        cursor = f"0-{last_event_id}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + FOLLOW_TIMEOUT
+
+        # Backlog first
+        entries = await self.redis.xrange(self.key, min=f"0-{last_event_id + 1}")
+        for entry_id, fields in entries:
+            if END_FIELD in fields:
+                return
+            cursor = entry_id
+            yield fields[FRAME_FIELD]
+
+        # Then the live tail
+        while loop.time() < deadline:
+            result = await self.redis.xread({self.key: cursor}, block=FOLLOW_BLOCK_MS)
+            if not result:
+                yield HEARTBEAT_FRAME
+                continue
+
+            for entry_id, fields in result[0][1]:
+                if END_FIELD in fields:
+                    return
+                cursor = entry_id
+                yield fields[FRAME_FIELD]
+
+
+async def buffered_frames(
+    frames: AsyncIterator[str],
+    buffer: StreamBuffer
+) -> AsyncGenerator[str, None]:
+    """
+    Relay frames to the client while writing them to the buffer
+
+    The upstream frames are consumed by a background task, so the run keeps
+    going and keeps being buffered if the client disconnects mid-reply.
+    Buffer failures are logged and never interrupt the live response.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        buffering = True
+        try:
+            async for frame in frames:
+                queue.put_nowait(frame)
+
+                event_id = frame_event_id(frame)
+                if buffering and event_id is not None:
+                    try:
+                        await buffer.append(event_id, frame)
+                    except Exception as e:
+                        logger.warning(f"Stream buffer write failed, disabling buffering: {e}")
+                        buffering = False
+        except Exception as e:
+            logger.error(f"Stream pump error: {e}")
+        finally:
+            queue.put_nowait(None)
+            if buffering:
+                try:
+                    await buffer.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close stream buffer: {e}")
+
+    task = asyncio.create_task(pump())
+    _pumps.add(task)
+    task.add_done_callback(_pumps.discard)
+
+    while True:
+        frame = await queue.get()
+        if frame is None:
+            break
+        yield frame
+
+
+def get_stream_buffer(redis_client, stream_id: Optional[str] = None) -> Optional[StreamBuffer]:
+    """Create a buffer for a new (or existing) stream, or None without Redis"""
+    if redis_client is None:
+        return None
+    return StreamBuffer(redis_client, stream_id or new_stream_id())
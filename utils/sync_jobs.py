@@ -0,0 +1,559 @@
+"""
+Catalog Sync Jobs
+Runs the WooCommerce -> OpenAI catalog sync as a resumable job: products are
+fetched, formatted and uploaded one shard at a time, with progress saved to
+Redis after every shard so a timed-out or failed step resumes where it stopped.
+
+Usage:
+    python -m utils.sync_jobs            # start (or resume) a job and run it to the end
+    python -m utils.sync_jobs <job_id>   # resume a specific job
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from .clients import ClientConfigError, get_openai_client, get_redis, get_woocommerce_api
+from .products import format_catalog_compact, format_product_for_ai
+from .run_scheduler import RELEASE_SCRIPT, RENEW_SCRIPT
+from .variation_index import VARIATION_INDEX_KEY, VARIATION_INDEX_TTL, fetch_variation_summaries
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+
+# WooCommerce pages per uploaded file (500 products)
+SHARD_PAGES = 5
+
+# Wall-clock budget for one step; a step always finishes the shard it started,
+# so keep this well under the function timeout
+STEP_SECONDS = float(os.getenv("SYNC_STEP_SECONDS", "25"))
+
+# "compact" uploads one short line per product (utils.products compact
+# profile), "full" the original blocks; switching re-uploads every shard
+CATALOG_PROFILE = os.getenv("CATALOG_PROFILE", "compact")
+
+# Consecutive failed steps before a job is given up
+MAX_ATTEMPTS = 3
+
+# A running job with no progress for this long is considered abandoned
+STALE_AFTER = 600  # seconds
+
+# Lease on a job while one invocation works on it, renewed after every shard
+STEP_LEASE_MS = 120000
+
+JOB_TTL = 7 * 24 * 3600  # seconds
+
+# Without Redis, a running sync marks the vector store's metadata
+# ("<job id>:<expiry>") so inline syncs on other instances back off
+SYNC_CLAIM_KEY = "sync_job"
+SYNC_CLAIM_SECONDS = 3600  # Outlives any inline sync; cleared when it ends
+CLAIM_SETTLE_SECONDS = 1.0
+
+CURRENT_JOB_KEY = "sync:job:current"
+SHARD_MANIFEST_KEY = "catalog:shards"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+@dataclass
+class Shard:
+    """One uploaded slice of the catalog"""
+    index: int
+    first_page: int
+    last_page: int
+    products: int
+    hash: str
+    file_id: Optional[str] = None
+    reused: bool = False  # Unchanged since the last sync, file kept as is
+
+
+@dataclass
+class SyncJob:
+    """Checkpointed state of one catalog sync"""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"  # queued | running | completed | skipped | failed
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    next_page: int = 1
+    total_pages: Optional[int] = None
+    total_products: Optional[int] = None
+    products_done: int = 0
+    shards: List[Shard] = field(default_factory=list)
+    vector_store_id: Optional[str] = None
+    steps: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    hash: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def fetched_all(self) -> bool:
+        return self.total_pages is not None and self.next_page > self.total_pages
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "SyncJob":
+        data = json.loads(raw)
+        data["shards"] = [Shard(**s) for s in data.get("shards", [])]
+        return cls(**data)
+
+    def progress(self) -> dict:
+        """Status payload with throughput and a rough ETA"""
+        end = self.finished_at or time.time()
+        elapsed = max(end - self.created_at, 0.001)
+        rate = self.products_done / elapsed
+        remaining = None
+        if self.active and self.total_products and rate > 0:
+            remaining = round(max(self.total_products - self.products_done, 0) / rate, 1)
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "pages_done": self.next_page - 1,
+            "total_pages": self.total_pages,
+            "products_done": self.products_done,
+            "total_products": self.total_products,
+            "shards_done": len(self.shards),
+            "shards_reused": sum(1 for s in self.shards if s.reused),
+            "steps": self.steps,
+            "elapsed_seconds": round(elapsed, 1),
+            "products_per_second": round(rate, 1),
+            "eta_seconds": remaining,
+            "vector_store_id": self.vector_store_id,
+            "hash": self.hash,
+            "error": self.error,
+        }
+
+
+class SyncJobStore:
+    """
+    Job state in Redis (`sync:job:{id}`), or in process when Redis is missing
+
+    Only Redis state survives between serverless invocations, so without it
+    a job has to run to completion in the request that started it.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._jobs: Dict[str, str] = {}
+        self._current: Optional[str] = None
+
+    @property
+    def shared(self) -> bool:
+        return self.redis is not None
+
+    def load(self, job_id: str) -> Optional[SyncJob]:
+        raw = self.redis.get(f"sync:job:{job_id}") if self.redis else self._jobs.get(job_id)
+        return SyncJob.from_json(raw) if raw else None
+
+    def save(self, job: SyncJob):
+        job.updated_at = time.time()
+        if self.redis:
+            self.redis.set(f"sync:job:{job.id}", job.to_json(), ex=JOB_TTL)
+        else:
+            self._jobs[job.id] = job.to_json()
+
+    def current(self) -> Optional[SyncJob]:
+        job_id = self.redis.get(CURRENT_JOB_KEY) if self.redis else self._current
+        return self.load(job_id) if job_id else None
+
+    def claim_current(self, job: SyncJob) -> bool:
+        """Make `job` the active sync unless another one already is"""
+        if self.redis:
+            return bool(self.redis.set(CURRENT_JOB_KEY, job.id, nx=True, ex=JOB_TTL))
+        if self._current:
+            return False
+        self._current = job.id
+        return True
+
+    def clear_current(self, job: SyncJob):
+        if self.redis:
+            self.redis.eval(RELEASE_SCRIPT, 1, CURRENT_JOB_KEY, job.id)
+        elif self._current == job.id:
+            self._current = None
+
+    def lock(self, job_id: str) -> Optional[str]:
+        """Lease the job to this invocation; None if another step is running"""
+        token = uuid.uuid4().hex
+        if self.redis and not self.redis.set(f"sync:job:{job_id}:lock", token, nx=True, px=STEP_LEASE_MS):
+            return None
+        return token
+
+    def renew(self, job_id: str, token: str) -> bool:
+        """Extend the lease; False if it expired and another step may own the job"""
+        if not self.redis:
+            return True
+        return bool(self.redis.eval(RENEW_SCRIPT, 1, f"sync:job:{job_id}:lock", token, STEP_LEASE_MS))
+
+    def unlock(self, job_id: str, token: str):
+        if self.redis:
+            try:
+                self.redis.eval(RELEASE_SCRIPT, 1, f"sync:job:{job_id}:lock", token)
+            except Exception as e:
+                logger.warning(f"Failed to release sync job lock: {e}")
+
+
+class SyncBusyError(RuntimeError):
+    """Another instance's inline sync holds the vector store (no-Redis mode)"""
+
+
+class LeaseLostError(RuntimeError):
+    """The step's lease expired mid-step; its progress must not be saved"""
+
+
+def start_job(store: SyncJobStore) -> tuple:
+    """
+    Create a sync job, or return the one already in progress
+
+    Returns:
+        (job, created) - created is False when an active job was returned
+    """
+    current = store.current()
+    if current is not None:
+        if current.active:
+            return current, False
+        # Finished job whose pointer was never cleared
+        store.clear_current(current)
+
+    job = SyncJob()
+    store.save(job)
+    if not store.claim_current(job):
+        return store.current() or job, False
+
+    logger.info(f"Created sync job {job.id}")
+    return job, True
+
+
+def is_stale(job: SyncJob) -> bool:
+    return job.active and time.time() - job.updated_at > STALE_AFTER
+
+
+def run_step(store: SyncJobStore, job_id: str, budget: float = STEP_SECONDS) -> Optional[SyncJob]:
+    """
+    Advance a job by as many shards as fit in `budget` seconds
+
+    Progress is saved after every shard, once the step's lease has been
+    renewed. A failed step leaves the job at its last completed shard so the
+    next step retries from there; a step that lost its lease saves nothing.
+
+    Returns:
+        The job after this step, or None if it does not exist
+    """
+    token = store.lock(job_id)
+    job = store.load(job_id)
+    if job is None or not job.active or token is None:
+        if token:
+            store.unlock(job_id, token)
+        return job
+
+    deadline = time.monotonic() + budget
+    lease_lost = False
+    job.status = "running"
+    job.steps += 1
+
+    try:
+        wcapi = get_woocommerce_api()
+        client = get_openai_client()
+        if job.vector_store_id is None:
+            job.vector_store_id = resolve_vector_store(client)
+            store.save(job)
+
+        previous = load_manifest(store.redis)
+        while not job.fetched_all:
+            sync_shard(job, store, wcapi, client, previous)
+            if not store.renew(job_id, token):
+                raise LeaseLostError(f"Sync job {job.id} lease expired during shard {len(job.shards) - 1}")
+            job.attempts = 0
+            store.save(job)
+            if time.monotonic() >= deadline:
+                break
+
+        if job.fetched_all:
+            finalize(job, store, client, previous)
+
+    except LeaseLostError as e:
+        # Another invocation may be running the job from its last saved shard
+        logger.warning(str(e))
+        lease_lost = True
+
+    except Exception as e:
+        # Missing configuration will not fix itself on retry
+        job.attempts = MAX_ATTEMPTS if isinstance(e, ClientConfigError) else job.attempts + 1
+        job.error = str(e)
+        logger.error(f"Sync job {job.id} step failed (attempt {job.attempts}/{MAX_ATTEMPTS}): {e}")
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = "failed"
+            job.finished_at = time.time()
+            store.clear_current(job)
+
+    finally:
+        if not lease_lost:
+            store.save(job)
+        store.unlock(job_id, token)
+
+    return store.load(job_id) if lease_lost else job
+
+
+def run_to_completion(store: SyncJobStore, job_id: str) -> Optional[SyncJob]:
+    """
+    Run steps back to back in this process (worker / no-Redis mode)
+
+    Without Redis nothing else keeps two instances from syncing at once, and
+    finalize deletes every file the job did not upload, so the job first
+    claims the vector store (see claim_vector_store).
+
+    Raises:
+        SyncBusyError: Another instance is syncing (no-Redis mode only)
+    """
+    job = store.load(job_id)
+    client = claimed = None
+    if job is not None and job.active and not store.shared:
+        client = get_openai_client()
+        job.vector_store_id = job.vector_store_id or resolve_vector_store(client)
+        store.save(job)
+        claim_vector_store(client, job.vector_store_id, job.id)
+        claimed = job.vector_store_id
+
+    try:
+        while job is not None and job.active:
+            steps = job.steps
+            job = run_step(store, job_id, budget=float("inf"))
+            if job is not None and job.active:
+                # Back off after a failure, or while another invocation holds the job
+                time.sleep(job.attempts if job.steps > steps else 1)
+    finally:
+        if claimed:
+            release_vector_store(client, claimed, job_id)
+    return job
+
+
+def _sync_claim(client, vector_store_id: str) -> tuple:
+    """(metadata, ID of the job holding the vector store or None)"""
+    metadata = dict(client.beta.vector_stores.retrieve(vector_store_id).metadata or {})
+    holder, _, expires = (metadata.get(SYNC_CLAIM_KEY) or "").partition(":")
+    if holder and expires.isdigit() and int(expires) > time.time():
+        return metadata, holder
+    return metadata, None
+
+
+def claim_vector_store(client, vector_store_id: str, job_id: str):
+    """
+    Mark the vector store as being synced by `job_id`
+
+    Metadata updates are last-writer-wins, so the claim is read back after
+    CLAIM_SETTLE_SECONDS: of two syncs claiming at once, only the one whose
+    write landed last goes ahead.
+
+    Raises:
+        SyncBusyError: Another job holds an unexpired claim
+    """
+    metadata, holder = _sync_claim(client, vector_store_id)
+    if holder and holder != job_id:
+        raise SyncBusyError(f"Sync job {holder} is already running on another instance")
+
+    metadata[SYNC_CLAIM_KEY] = f"{job_id}:{int(time.time()) + SYNC_CLAIM_SECONDS}"
+    client.beta.vector_stores.update(vector_store_id, metadata=metadata)
+    time.sleep(CLAIM_SETTLE_SECONDS)
+
+    _, holder = _sync_claim(client, vector_store_id)
+    if holder != job_id:
+        raise SyncBusyError(f"Sync job {holder} claimed the vector store first")
+
+
+def release_vector_store(client, vector_store_id: str, job_id: str):
+    """Clear this job's claim (left to expire if it cannot be cleared)"""
+    try:
+        metadata, holder = _sync_claim(client, vector_store_id)
+        if holder == job_id:
+            metadata[SYNC_CLAIM_KEY] = ""
+            client.beta.vector_stores.update(vector_store_id, metadata=metadata)
+    except Exception as e:
+        logger.warning(f"Failed to release sync claim on {vector_store_id}: {e}")
+
+
+def resolve_vector_store(client) -> str:
+    """The assistant's vector store, created and attached if it has none"""
+    assistant_id = os.getenv("OPENAI_ASSISTANT_ID")
+    if not assistant_id:
+        raise RuntimeError("Missing OPENAI_ASSISTANT_ID")
+
+    tool_res = client.beta.assistants.retrieve(assistant_id).tool_resources
+    if tool_res and tool_res.file_search and tool_res.file_search.vector_store_ids:
+        return tool_res.file_search.vector_store_ids[0]
+
+    vs_id = client.beta.vector_stores.create(name="ShopiPet Store").id
+    client.beta.assistants.update(
+        assistant_id=assistant_id,
+        tool_resources={"file_search": {"vector_store_ids": [vs_id]}}
+    )
+    return vs_id
+
+
+def fetch_page(wcapi, page: int):
+    """
+    One page of published products in a stable order
+
+    Returns:
+        (products, total_pages, total_products)
+    """
+    res = wcapi.get("products", params={
+        "per_page": PER_PAGE,
+        "page": page,
+        "status": "publish",
+        # Ordered by ID so pages stay aligned across invocations
+        "orderby": "id",
+        "order": "asc",
+    })
+    if res.status_code != 200:
+        raise RuntimeError(f"WooCommerce Error {res.status_code}: {res.text[:200]}")
+
+    products = res.json()
+    total_pages = res.headers.get("X-WP-TotalPages")
+    total_products = res.headers.get("X-WP-Total")
+    if total_pages is None:
+        # No pagination headers: a short page is the last one
+        total_pages = page if len(products) < PER_PAGE else page + 1
+    return products, int(total_pages), int(total_products) if total_products else None
+
+
+def format_catalog(products: list) -> str:
+    """Shard file text in the CATALOG_PROFILE format"""
+    if CATALOG_PROFILE == "compact":
+        return format_catalog_compact(products)
+    return "\n".join(format_product_for_ai(p) for p in products)
+
+
+def sync_shard(job: SyncJob, store: SyncJobStore, wcapi, client, previous: Dict[int, dict]):
+    """Fetch, format and upload the next shard, then record it on the job"""
+    first_page = job.next_page
+    products = []
+    page = first_page
+    while page < first_page + SHARD_PAGES and (job.total_pages is None or page <= job.total_pages):
+        batch, total_pages, total_products = fetch_page(wcapi, page)
+        job.total_pages = total_pages
+        job.total_products = total_products or job.total_products
+        products.extend(batch)
+        page += 1
+
+    index = len(job.shards)
+    catalog_text = format_catalog(products)
+    shard_hash = hashlib.md5(catalog_text.encode("utf-8")).hexdigest()
+
+    if store.redis:
+        # Per-product writes, so re-running a shard after a failure is harmless
+        summaries = fetch_variation_summaries(wcapi, products)
+        if summaries:
+            store.redis.hset(variation_build_key(job), mapping={
+                str(product_id): json.dumps(summary, ensure_ascii=False)
+                for product_id, summary in summaries.items()
+            })
+            store.redis.expire(variation_build_key(job), JOB_TTL)
+
+    shard = Shard(index=index, first_page=first_page, last_page=page - 1, products=len(products), hash=shard_hash)
+    old = previous.get(index)
+    if old and old.get("hash") == shard_hash and old.get("file_id"):
+        shard.file_id = old["file_id"]
+        shard.reused = True
+    elif products:
+        uploaded = client.beta.vector_stores.files.upload_and_poll(
+            vector_store_id=job.vector_store_id,
+            file=(f"catalog-{index:04d}.txt", catalog_text.encode("utf-8"))
+        )
+        shard.file_id = uploaded.id
+
+    job.shards.append(shard)
+    job.next_page = page
+    job.products_done += len(products)
+    logger.info(
+        f"Sync job {job.id}: shard {index} pages {first_page}-{page - 1} "
+        f"({len(products)} products, {'unchanged' if shard.reused else 'uploaded'})"
+    )
+
+
+def finalize(job: SyncJob, store: SyncJobStore, client, previous: Dict[int, dict]):
+    """Swap the new shards in: drop stale files, publish the manifest and variation index"""
+    job.hash = hashlib.md5("".join(s.hash for s in job.shards).encode("utf-8")).hexdigest()
+    keep = {s.file_id for s in job.shards if s.file_id}
+    unchanged = len(previous) == len(job.shards) and all(s.reused for s in job.shards)
+
+    if not unchanged:
+        # Everything not uploaded by this job: previous shards, the old single
+        # catalog file, and uploads from failed attempts
+        files = list(client.beta.vector_stores.files.list(vector_store_id=job.vector_store_id))
+        for file in files:
+            if file.id in keep:
+                continue
+            try:
+                client.beta.vector_stores.files.delete(vector_store_id=job.vector_store_id, file_id=file.id)
+                client.files.delete(file.id)
+            except Exception as delete_error:
+                logger.warning(f"Failed to delete file {file.id}: {delete_error}")
+
+    if store.redis:
+        try:
+            build_key = variation_build_key(job)
+            pipe = store.redis.pipeline()
+            if store.redis.exists(build_key):
+                pipe.rename(build_key, VARIATION_INDEX_KEY)
+                pipe.expire(VARIATION_INDEX_KEY, VARIATION_INDEX_TTL)
+            else:
+                pipe.delete(VARIATION_INDEX_KEY)
+            pipe.set(SHARD_MANIFEST_KEY, json.dumps([
+                {"index": s.index, "hash": s.hash, "file_id": s.file_id} for s in job.shards
+            ]))
+            pipe.set("catalog_hash", job.hash)
+            pipe.set("last_sync_timestamp", str(int(time.time())))
+            pipe.execute()
+        except Exception as redis_error:
+            logger.warning(f"Failed to publish sync results: {redis_error}")
+
+    job.status = "skipped" if unchanged else "completed"
+    job.error = None
+    job.finished_at = time.time()
+    store.clear_current(job)
+    logger.info(f"Sync job {job.id} {job.status}: {job.products_done} products in {len(job.shards)} shards")
+
+
+def load_manifest(redis_client) -> Dict[int, dict]:
+    """Shards of the last completed sync, by index"""
+    if redis_client is None:
+        return {}
+    try:
+        raw = redis_client.get(SHARD_MANIFEST_KEY)
+        return {s["index"]: s for s in json.loads(raw)} if raw else {}
+    except Exception as e:
+        logger.warning(f"Failed to read shard manifest: {e}")
+        return {}
+
+
+def variation_build_key(job: SyncJob) -> str:
+    return f"{VARIATION_INDEX_KEY}:building:{job.id}"
+
+
+def main():
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    store = SyncJobStore(get_redis())
+    if len(sys.argv) > 1:
+        job_id = sys.argv[1]
+    else:
+        job_id = start_job(store)[0].id
+
+    job = run_to_completion(store, job_id)
+    print(json.dumps(job.progress() if job else {"error": f"No job {job_id}"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Latency Instrumentation
+Per-request stage timings exposed as Server-Timing headers, structured log
+lines and Prometheus histograms.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, tuned for chat turns (tens of ms up to a minute)
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus data model"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide histogram families keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._series: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            family = self._series.setdefault(name, {})
+            histogram = family.get(key)
+            if histogram is None:
+                histogram = family[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Render all histograms in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, family in self._series.items():
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+
+                for key, histogram in family.items():
+                    base = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+                    sep = "," if base else ""
+
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+                    cumulative += histogram.counts[-1]
+                    lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+
+                    labels = f"{{{base}}}" if base else ""
+                    lines.append(f"{name}_sum{labels} {histogram.sum}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+STAGE_METRIC = "shopipet_chat_stage_seconds"
+STAGE_HELP = "Duration of chat pipeline stages"
+
+
+class RequestTimer:
+    """
+    Collects stage durations for one chat request
+
+    Usage:
+        timer = RequestTimer("chat")
+        with timer.stage("thread_create"):
+            ...
+        response.headers["Server-Timing"] = timer.server_timing()
+        timer.finish(thread_id=thread_id)
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and record it under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Record a stage duration and feed the histogram"""
+        self.stages.append((name, seconds))
+        metrics.observe(STAGE_METRIC, seconds, STAGE_HELP, endpoint=self.endpoint, stage=name)
+
+    def mark(self, name: str):
+        """Record the time elapsed since the request started (e.g. first_token)"""
+        self.record(name, self.elapsed())
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, include_total: bool = True) -> str:
+        """Format the recorded stages as a Server-Timing header value"""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        if include_total:
+            parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def finish(self, **fields):
+        """Record the total and write one structured log line (only once)"""
+        if self._finished:
+            return
+        self._finished = True
+        self.record("total", self.elapsed())
+
+        durations: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            durations[name] = round(durations.get(name, 0.0) + seconds * 1000, 1)
+
+        logger.info(json.dumps({
+            "event": "chat_timing",
+            "endpoint": self.endpoint,
+            "stages_ms": durations,
+            **fields
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def optional_stage(timer: Optional[RequestTimer], name: str):
+    """Time a block when a timer is given, otherwise do nothing"""
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
@@ -0,0 +1,82 @@
+"""
+Variation Index
+Pre-formatted card variations for every variable product, built during sync
+and read at chat time so showing a variable product needs no WooCommerce call.
+The index expires unless a sync republishes it.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+from .products import format_variations_for_card
+
+logger = logging.getLogger(__name__)
+
+VARIATION_INDEX_KEY = "catalog:variations"
+
+# Lifetime of a published index: three daily syncs. If syncs stop, the index
+# lapses and chat goes back to live variation fetches instead of serving old
+# prices and stock indefinitely.
+VARIATION_INDEX_TTL = 3 * 24 * 3600  # seconds
+
+# Parallel variation requests during sync
+SYNC_WORKERS = 8
+
+
+def fetch_variation_summaries(wcapi, products: list) -> Dict[int, dict]:
+    """
+    Fetch and format variations for all variable products in parallel
+
+    Args:
+        wcapi: WooCommerce API instance
+        products: Raw WooCommerce products (non-variable ones are skipped)
+
+    Returns:
+        Dict of product ID -> format_variations_for_card() result.
+        Products whose variations could not be fetched are left out.
+    """
+    variable_ids = [p.get('id') for p in products if p.get('type') == 'variable']
+    if not variable_ids:
+        return {}
+
+    def fetch(product_id):
+        res = wcapi.get(f"products/{product_id}/variations", params={"per_page": 100})
+        if res.status_code != 200:
+            raise RuntimeError(f"WooCommerce Error {res.status_code}")
+        return format_variations_for_card(res.json())
+
+    summaries = {}
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+        futures = {pool.submit(fetch, product_id): product_id for product_id in variable_ids}
+        for future, product_id in futures.items():
+            try:
+                summaries[product_id] = future.result()
+            except Exception as e:
+                logger.warning(f"Variation fetch failed for product {product_id}: {e}")
+
+    return summaries
+
+
+async def load_variation_summaries(redis_client, product_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Read indexed variation summaries for the given products
+
+    Returns:
+        Dict of product ID -> summary for the products found in the index
+    """
+    product_ids = list(product_ids)
+    if redis_client is None or not product_ids:
+        return {}
+
+    try:
+        values = await redis_client.hmget(VARIATION_INDEX_KEY, [str(pid) for pid in product_ids])
+    except Exception as e:
+        logger.warning(f"Variation index read failed: {e}")
+        return {}
+
+    return {
+        pid: json.loads(value)
+        for pid, value in zip(product_ids, values)
+        if value is not None
+    }